@@ -1,17 +1,45 @@
-from flask import Flask, render_template, redirect, url_for, flash, request
-from flask_sqlalchemy import SQLAlchemy
+from flask import Blueprint, Flask, current_app, render_template, redirect, url_for, flash, request, Response, stream_with_context, jsonify
+from sqlalchemy import literal, select, text, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, make_transient_to_detached
 from flask_migrate import Migrate
-from flask_login import LoginManager, login_user, current_user, logout_user, login_required, UserMixin
+from flask_login import LoginManager, login_user, current_user, logout_user, login_required
+from config import engine_options, presence_max_streams
+from models import db, User, Timestamp, TimestampArchive, WorkSummary, Vacation, Geofence
 from forms import RegistrationForm, LoginForm, AdminCodeForm, EditTimestampForm, VacationRequestForm, UpdateAdminCodeForm, GeofenceForm
-from datetime import datetime
-from geopy.distance import geodesic
+from pagination import KeysetPage, decode_cursor, paginate_keyset
+from geofencing import GeofenceMatcher
+from passwords import PasswordManager
+from instrumentation import RequestTiming
+from reporting import current_totals_by_user, punches_outside_geofences, worked_time_by_period
+from vacations import ACTIVE_STATUSES, days_off, find_overlap, vacations_between
+from cache import Cache, MemoryBackend
+from assets import Assets
+from archive import add_months, archive_before, archive_cutoff, archived_through, ensure_partitions
+from presence import PresenceIndex
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+import click
+import csv
+import io
+import json
 import os
-import requests
+import time
 
-db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
+password_manager = PasswordManager()
+request_timing = RequestTiming()
+dashboard_cache = Cache()
+identity_cache = MemoryBackend()
+assets = Assets()
+geofence_matcher = GeofenceMatcher(
+    lambda admin_id: db.session.query(Geofence.latitude, Geofence.longitude, Geofence.radius).filter_by(admin_id=admin_id).all(),
+)
+presence = PresenceIndex(lambda: load_open_punches())
+main = Blueprint('main', __name__, cli_group=None)
+api = Blueprint('api', __name__, url_prefix='/api/v1')
 
 def create_app():
     app = Flask(__name__)
@@ -23,86 +51,344 @@ def create_app():
         uri = uri.replace("postgres://", "postgresql://", 1)
     
     app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+    app.config['TIMESTAMPS_PER_PAGE'] = int(os.getenv('TIMESTAMPS_PER_PAGE', 50))
+    app.config['GEOFENCE_INDEX_TTL'] = int(os.getenv('GEOFENCE_INDEX_TTL', 60))
+    app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    app.config['TIMESTAMP_KEEP_MONTHS'] = int(os.getenv('TIMESTAMP_KEEP_MONTHS', 12))
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    app.config['BCRYPT_MAX_THREADS'] = int(os.getenv('BCRYPT_MAX_THREADS', 4))
+    app.config['LOGIN_CACHE_TTL'] = int(os.getenv('LOGIN_CACHE_TTL', 300))
+    app.config['BULK_EDIT_MAX_ROWS'] = int(os.getenv('BULK_EDIT_MAX_ROWS', 5000))
+    app.config['CACHE_URL'] = os.getenv('CACHE_URL', '')
+    app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 15))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    app.config['IDENTITY_CACHE_TTL'] = int(os.getenv('IDENTITY_CACHE_TTL', 30))
+    app.config['PRESENCE_RESYNC_INTERVAL'] = int(os.getenv('PRESENCE_RESYNC_INTERVAL', 30))
+    app.config['PRESENCE_STREAM_MAX_SECONDS'] = int(os.getenv('PRESENCE_STREAM_MAX_SECONDS', 300))
+    app.config['PRESENCE_MAX_STREAMS'] = presence_max_streams()
+    app.config['PRESENCE_POLL_SECONDS'] = int(os.getenv('PRESENCE_POLL_SECONDS', 15))
+    app.config['REQUEST_TIMING'] = os.getenv('REQUEST_TIMING', '').lower() in ('1', 'true', 'yes')
 
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
-
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
-
-    # Register the custom filter with Jinja2
-    @app.template_filter('format_worked_hours')
-    def format_worked_hours(seconds):
-        hours, remainder = divmod(seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-        return f'{hours}h {minutes}m'
+    password_manager.init_app(app)
+    request_timing.init_app(app, db)
+    dashboard_cache.init_app(app)
+    geofence_matcher.init_app(app)
+    assets.init_app(app)
+    presence.init_app(app)
+    app.register_blueprint(main)
+    app.register_blueprint(api)
 
     return app
 
-app = create_app()
-
-class User(db.Model, UserMixin):
-    id = db.Column(db.Integer, primary_key=True)
-    first_name = db.Column(db.String(20), nullable=False)
-    last_name = db.Column(db.String(20), nullable=False)
-    password = db.Column(db.String(60), nullable=False)
-    role = db.Column(db.String(10), nullable=False)
-    admin_code = db.Column(db.String(255), nullable=True)
-    
-    timestamps = db.relationship('Timestamp', backref='user', lazy=True)
-
-class Timestamp(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    clock_in = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    clock_out = db.Column(db.DateTime, nullable=True)
-    break_duration = db.Column(db.Integer, nullable=True)
-    lunch_duration = db.Column(db.Integer, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    edited = db.Column(db.Boolean, default=False)
-    clock_in_edited = db.Column(db.Boolean, default=False)
-    clock_out_edited = db.Column(db.Boolean, default=False)
-    break_duration_edited = db.Column(db.Boolean, default=False)
-    lunch_duration_edited = db.Column(db.Boolean, default=False)
-
-class Vacation(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    start_date = db.Column(db.Date, nullable=False)
-    end_date = db.Column(db.Date, nullable=False)
-    status = db.Column(db.String(20), nullable=False, default='pending')
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-
-class Geofence(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    latitude = db.Column(db.Float, nullable=False)
-    longitude = db.Column(db.Float, nullable=False)
-    radius = db.Column(db.Float, nullable=False)
-    admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+@login_manager.user_loader
+def load_user(user_id):
+    return load_cached_user(int(user_id))
+
+def paginate_timestamps(query, sort_column=Timestamp.clock_in, id_column=Timestamp.id):
+    return paginate_keyset(
+        query,
+        sort_column,
+        id_column,
+        before=request.args.get('before'),
+        after=request.args.get('after'),
+        per_page=current_app.config['TIMESTAMPS_PER_PAGE'],
+    )
+
+def paginate_timestamp_history(user_id):
+    """One page of a worker's punches that reads timestamp_archive only once the page reaches archived months."""
+    live = Timestamp.query.filter_by(user_id=user_id)
+    through = archived_through(db.session, TimestampArchive)
+    if through is None:
+        return paginate_timestamps(live)
+    after_key = decode_cursor(request.args.get('after'))
+    cursor = after_key or decode_cursor(request.args.get('before'))
+    if cursor is None or cursor[0] > through:
+        page = paginate_timestamps(live)
+        # Every archived row is at or before `through`, so pages that stay after it need no archive
+        if after_key is not None or (page.has_older and page.items[-1].clock_in > through):
+            return page
+    columns = ('id', 'clock_in', 'clock_out', 'break_duration', 'lunch_duration', 'worked_seconds')
+    history = union_all(
+        select(*(getattr(Timestamp, name) for name in columns), literal(False).label('archived')).where(Timestamp.user_id == user_id),
+        select(*(getattr(TimestampArchive, name) for name in columns), literal(True).label('archived')).where(TimestampArchive.user_id == user_id),
+    ).subquery()
+    return paginate_timestamps(db.session.query(history), history.c.clock_in, history.c.id)
+
+def load_cached_user(user_id):
+    # The cache holds a detached snapshot; merge(load=False) attaches a copy to this request's session without a query
+    snapshot = identity_cache.get(f'user:{user_id}')
+    if snapshot is not None:
+        return db.session.merge(snapshot, load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        identity_cache.set(f'user:{user_id}', snapshot, current_app.config['IDENTITY_CACHE_TTL'])
+    return user
+
+def find_admin_id(admin_code):
+    admin_id = identity_cache.get(f'admin_code:{admin_code}')
+    if admin_id is None:
+        admin = User.query.with_entities(User.id).filter_by(admin_code=admin_code, role='admin').first()
+        if admin is None:
+            return None
+        admin_id = admin.id
+        identity_cache.set(f'admin_code:{admin_code}', admin_id, current_app.config['IDENTITY_CACHE_TTL'])
+    return admin_id
+
+def invalidate_identity(user_ids=(), admin_codes=()):
+    for user_id in user_ids:
+        identity_cache.delete(f'user:{user_id}')
+    for admin_code in admin_codes:
+        identity_cache.delete(f'admin_code:{admin_code}')
+
+def read_location(data=None):
+    data = request.form if data is None else data
+    try:
+        location = (float(data['latitude']), float(data['longitude']))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= location[0] <= 90 and -180 <= location[1] <= 180):
+        return None
+    return location
+
+def row_to_dict(row):
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+def load_worker_dashboard(user_id):
+    # Plain dicts rather than ORM instances so the result can outlive the session and be pickled
+    clocked_in = Timestamp.query.filter_by(user_id=user_id, clock_out=None).first()
+    page = paginate_timestamps(Timestamp.query.filter_by(user_id=user_id))
+    return {
+        'clocked_in': row_to_dict(clocked_in) if clocked_in else None,
+        'timestamps': KeysetPage([row_to_dict(timestamp) for timestamp in page], older_cursor=page.older_cursor, newer_cursor=page.newer_cursor),
+        'vacations': [row_to_dict(vacation) for vacation in Vacation.query.filter_by(user_id=user_id).all()],
+    }
+
+def load_open_punches():
+    # A connection of its own, returned to the pool at once: this also runs inside long-lived SSE responses
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            select(User.admin_code, User.id, User.first_name, User.last_name, Timestamp.id.label('timestamp_id'), Timestamp.clock_in)
+            .join(Timestamp, Timestamp.user_id == User.id)
+            .where(Timestamp.clock_out.is_(None), User.role == 'worker')
+        ).all()
+    return [{'admin_code': row.admin_code, 'user_id': row.id, 'name': f'{row.first_name} {row.last_name}', 'timestamp_id': row.timestamp_id, 'clock_in': row.clock_in.isoformat()} for row in rows]
+
+def invalidate_worker_dashboard(*user_ids):
+    for user_id in user_ids:
+        dashboard_cache.delete(f'worker_dashboard:{user_id}')
+        dashboard_cache.delete(f'punch_status:{user_id}')
+
+def calculate_worked_seconds(clock_in, clock_out, break_duration, lunch_duration):
+    if clock_out is None:
+        return None
+    # Callers reject these with a message; negative minutes would otherwise add worked time
+    if (break_duration or 0) < 0 or (lunch_duration or 0) < 0:
+        raise ValueError('break_duration and lunch_duration must not be negative')
+    seconds = int((clock_out - clock_in).total_seconds()) - ((break_duration or 0) + (lunch_duration or 0)) * 60
+    return max(seconds, 0)
+
+def work_summary_periods(clock_in):
+    day = clock_in.date()
+    return (('day', day), ('week', day - timedelta(days=day.weekday())))
+
+def dialect_insert():
+    """The bound dialect's insert() with ON CONFLICT support, or None where there is none.
+
+    Imported here rather than at the top: the postgresql dialect module alone adds about
+    50 ms to every `import app`, and only punch and rollup writes need it.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+def apply_work_summary_deltas(deltas):
+    # deltas maps (user_id, period, period_start) to the seconds to add; negative values retract punches
+    rows = [
+        {'user_id': user_id, 'period': period, 'period_start': period_start, 'worked_seconds': seconds}
+        for (user_id, period, period_start), seconds in deltas.items() if seconds
+    ]
+    if not rows:
+        return
+    insert = dialect_insert()
+    if insert is not None:
+        # ON CONFLICT DO UPDATE: two first punches in a period cannot both insert; the second adds to the first's row
+        statement = insert(WorkSummary)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[WorkSummary.user_id, WorkSummary.period, WorkSummary.period_start],
+            set_={'worked_seconds': WorkSummary.worked_seconds + statement.excluded.worked_seconds},
+        ), rows)
+        return
+    for row in rows:
+        updated = WorkSummary.query.filter_by(user_id=row['user_id'], period=row['period'], period_start=row['period_start']).update(
+            {WorkSummary.worked_seconds: WorkSummary.worked_seconds + row['worked_seconds']}, synchronize_session=False)
+        if not updated:
+            db.session.add(WorkSummary(**row))
+
+def add_to_work_summary(user_id, clock_in, seconds):
+    # Incremental update of the day and ISO week rollups; pass a negative value to retract a punch
+    if seconds:
+        apply_work_summary_deltas({(user_id, period, period_start): seconds for period, period_start in work_summary_periods(clock_in)})
+
+def insert_open_punch(user_id, clock_in, location, punch_key):
+    """Clock in and return the new id, or None if the user already has an open punch or the key was used."""
+    values = dict(user_id=user_id, clock_in=clock_in, clock_in_latitude=location[0], clock_in_longitude=location[1], clock_in_key=punch_key)
+    insert = dialect_insert()
+    if insert is not None:
+        # ON CONFLICT DO NOTHING: a losing concurrent insert returns no row instead of raising
+        return db.session.execute(insert(Timestamp).values(**values).on_conflict_do_nothing().returning(Timestamp.id)).scalar()
+    try:
+        with db.session.begin_nested():
+            timestamp = Timestamp(**values)
+            db.session.add(timestamp)
+        return timestamp.id
+    except IntegrityError:
+        return None
+
+def close_punch(timestamp, clock_out, location, break_duration, lunch_duration):
+    """Clock out `timestamp` unless a concurrent request already did; returns whether this call closed it."""
+    worked_seconds = calculate_worked_seconds(timestamp.clock_in, clock_out, break_duration, lunch_duration)
+    closed = db.session.execute(
+        update(Timestamp).where(Timestamp.id == timestamp.id, Timestamp.clock_out.is_(None)).values(
+            clock_out=clock_out, clock_out_latitude=location[0], clock_out_longitude=location[1],
+            break_duration=break_duration, lunch_duration=lunch_duration, worked_seconds=worked_seconds,
+        )
+    ).rowcount
+    if closed:
+        add_to_work_summary(timestamp.user_id, timestamp.clock_in, worked_seconds)
+    return bool(closed)
+
+PUNCH_MESSAGES = {
+    'clocked_in': ('Du har nu checkat in.', 'success'),
+    'clocked_out': ('Du har nu checkat ut.', 'success'),
+    'duplicate': ('Din incheckning är redan registrerad.', 'info'),
+    'stale': ('Din status hade redan ändrats. Sidan är nu uppdaterad.', 'info'),
+    'negative_duration': ('Rast och lunch kan inte vara negativa.', 'danger'),
+    'no_location': ('Misslyckades med att hämta platsinformation. Vänligen försök igen.', 'danger'),
+    'no_admin': ('Ingen administratör hittades för att kontrollera geofences.', 'danger'),
+    'outside_clock_in': ('Du är för långt från tillåtet område för att checka in.', 'danger'),
+    'outside_clock_out': ('Du är för långt från tillåtet område för att checka ut.', 'danger'),
+}
+
+def record_punch(user, action, location, punch_key=None, timestamp_id=None, break_duration=0, lunch_duration=0):
+    """Clock `user` in or out, whichever applies, and return one of the PUNCH_MESSAGES keys.
+
+    `action` and `timestamp_id` describe what the client saw; when they no longer match the
+    database the punch is refused as stale instead of toggling the wrong way.
+    """
+    # Always decide from the database, never from a possibly stale cached page. The row lock makes a
+    # concurrent clock-out of the same punch wait here and then see it closed.
+    if (break_duration or 0) < 0 or (lunch_duration or 0) < 0:
+        return 'negative_duration'
+    clocked_in = Timestamp.query.filter_by(user_id=user.id, clock_out=None).with_for_update().first()
+    punch_key = str(punch_key)[:32] if punch_key else None
+    if clocked_in and action == 'clock_in' and punch_key and clocked_in.clock_in_key == punch_key:
+        return 'duplicate'
+    if (clocked_in and action == 'clock_in') or (not clocked_in and action == 'clock_out') or (clocked_in and timestamp_id and timestamp_id != clocked_in.id):
+        invalidate_worker_dashboard(user.id)
+        return 'stale'
+    if not location:
+        return 'no_location'
+    worker_admin_id = find_admin_id(user.admin_code)
+    if not worker_admin_id:
+        return 'no_admin'
+    if not geofence_matcher.is_inside(worker_admin_id, location):
+        return 'outside_clock_out' if clocked_in else 'outside_clock_in'
+
+    now = datetime.utcnow()
+    if clocked_in:
+        result = 'clocked_out' if close_punch(clocked_in, now, location, break_duration or 0, lunch_duration or 0) else 'stale'
+    else:
+        timestamp_id = insert_open_punch(user.id, now, location, punch_key)
+        result = 'clocked_in' if timestamp_id else 'duplicate'
+    db.session.commit()
+    invalidate_worker_dashboard(user.id)
+    if result == 'clocked_in':
+        presence.clock_in(user.admin_code, {'user_id': user.id, 'name': f'{user.first_name} {user.last_name}', 'timestamp_id': timestamp_id, 'clock_in': now.isoformat()})
+    elif result == 'clocked_out':
+        presence.clock_out(user.admin_code, user.id)
+    return result
 
 # Register the custom filter with Jinja2
-@app.template_filter('format_worked_hours')
+@main.app_template_filter('format_worked_hours')
 def format_worked_hours(seconds):
     hours, remainder = divmod(seconds, 3600)
     minutes, _ = divmod(remainder, 60)
     return f'{hours}h {minutes}m'
 
-@app.route("/")
+@main.cli.command('create-master')
+@click.option('--first-name', prompt='Förnamn')
+@click.option('--last-name', prompt='Efternamn')
+@click.option('--password', prompt='Lösenord', hide_input=True, confirmation_prompt=True)
+@click.option('--admin-code', prompt='Adminkod')
+def create_master(first_name, last_name, password, admin_code):
+    """Create a master user. The schema itself is managed with `flask db upgrade`."""
+    if User.query.filter_by(first_name=first_name, last_name=last_name).first():
+        raise click.ClickException('Det finns redan en användare med det namnet.')
+    db.session.add(User(first_name=first_name, last_name=last_name, password=password_manager.hash(password), role='master', admin_code=admin_code))
+    db.session.commit()
+    click.echo('Master-användare skapad.')
+
+@main.cli.command('archive-timestamps')
+@click.option('--keep-months', type=int, default=None, help='Full months kept live before the current one (default TIMESTAMP_KEEP_MONTHS).')
+@click.option('--ahead', type=int, default=2, help='Archive partitions to create beyond the months being moved.')
+@click.option('--batch-size', type=int, default=1000)
+def archive_timestamps(keep_months, ahead, batch_size):
+    """Move closed months of punches to timestamp_archive and create upcoming archive partitions."""
+    keep_months = current_app.config['TIMESTAMP_KEEP_MONTHS'] if keep_months is None else keep_months
+    cutoff = archive_cutoff(keep_months)
+    moved = archive_before(db.session, Timestamp, TimestampArchive, cutoff, batch_size=batch_size)
+    for month, count in sorted(moved.items()):
+        click.echo(f'{month:%Y-%m}: {count} stämplingar arkiverade')
+    # Months that reach the cutoff on the next runs find their partitions already in place
+    created = ensure_partitions(db.session, TimestampArchive, cutoff, add_months(cutoff, ahead - 1))
+    click.echo(f'Klart: {sum(moved.values())} stämplingar före {cutoff:%Y-%m-%d} arkiverade, {len(created)} partitioner säkerställda.')
+
+@main.route("/")
 def home():
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/health')
+def health():
+    pool = db.engine.pool
+    status = {'status': 'ok', 'database': 'ok', 'pool': {'class': type(pool).__name__}, 'cache': dashboard_cache.stats()}
+    # QueuePool exposes live counters; other pool classes (e.g. SQLite's) only a summary string
+    if hasattr(pool, 'checkedout'):
+        status['pool'].update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    else:
+        status['pool']['status'] = pool.status()
+    try:
+        db.session.execute(text('SELECT 1'))
+    except Exception as e:
+        current_app.logger.warning('Health check database error: %s', e)
+        status['status'] = status['database'] = 'error'
+        return jsonify(status), 503
+    return jsonify(status)
+
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     form = RegistrationForm()
     if form.validate_on_submit():
         admin_code = form.admin_code.data
-        admin = User.query.filter_by(admin_code=admin_code, role='admin').first()
-        if admin:
-            user = User(first_name=form.first_name.data, last_name=form.last_name.data, password=form.password.data, role='worker', admin_code=admin_code)
+        admin = find_admin_id(admin_code)
+        if admin and User.query.filter_by(first_name=form.first_name.data, last_name=form.last_name.data).first():
+            flash('Det finns redan en användare med det namnet.', 'danger')
+        elif admin:
+            user = User(first_name=form.first_name.data, last_name=form.last_name.data, password=password_manager.hash(form.password.data), role='worker', admin_code=admin_code)
             db.session.add(user)
             db.session.commit()
             flash('Ditt konto har skapats!', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         else:
             flash('Ogiltig admin kod. Vänligen kontakta din administratör.', 'danger')
     else:
@@ -111,31 +397,35 @@ def register():
                 flash(f"Fel i fältet '{getattr(form, field).label.text}': {error}", 'danger')
     return render_template('register.html', title='Registrera', form=form)
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(first_name=form.first_name.data, last_name=form.last_name.data).first()
-        if user and user.password == form.password.data:
+        if user and password_manager.verify(user.password, form.password.data):
+            if password_manager.needs_rehash(user.password):
+                user.password = password_manager.hash(form.password.data)
+                db.session.commit()
+                invalidate_identity(user_ids=[user.id])
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
-            return redirect(next_page) if next_page else redirect(url_for('master_dashboard' if user.role == 'master' else 'admin_dashboard' if user.role == 'admin' else 'worker_dashboard'))
+            return redirect(next_page) if next_page else redirect(url_for('main.master_dashboard' if user.role == 'master' else 'main.admin_dashboard' if user.role == 'admin' else 'main.worker_dashboard'))
         else:
             flash('Inloggningen misslyckades. Vänligen kontrollera förnamn, efternamn och lösenord.', 'danger')
     return render_template('login.html', title='Logga in', form=form)
 
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
-@app.route('/master_dashboard', methods=['GET', 'POST'])
+@main.route('/master_dashboard', methods=['GET', 'POST'])
 @login_required
 def master_dashboard():
     if current_user.role != 'master':
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     if request.method == 'POST':
         action = request.form.get('action')
@@ -144,10 +434,13 @@ def master_dashboard():
             last_name = request.form.get('last_name')
             password = request.form.get('password')
             admin_code = request.form.get('admin_code')
-            if first_name and last_name and password and admin_code:
-                new_admin = User(first_name=first_name, last_name=last_name, password=password, role='admin', admin_code=admin_code)
+            if User.query.filter_by(first_name=first_name, last_name=last_name).first():
+                flash('Det finns redan en användare med det namnet.', 'danger')
+            elif first_name and last_name and password and admin_code:
+                new_admin = User(first_name=first_name, last_name=last_name, password=password_manager.hash(password), role='admin', admin_code=admin_code)
                 db.session.add(new_admin)
                 db.session.commit()
+                invalidate_identity(admin_codes=[admin_code])
                 flash('Admin tillagd framgångsrikt', 'success')
         elif action == 'delete':
             admin_id = request.form.get('admin_id')
@@ -156,182 +449,572 @@ def master_dashboard():
                 if admin_to_delete and admin_to_delete.role == 'admin':
                     db.session.delete(admin_to_delete)
                     db.session.commit()
+                    invalidate_identity(user_ids=[admin_to_delete.id], admin_codes=[admin_to_delete.admin_code])
                     flash('Admin borttagen framgångsrikt', 'success')
 
     admins = User.query.filter_by(role='admin').all()
     return render_template('master_dashboard.html', title='Master Dashboard', admins=admins)
 
-@app.route('/admin_dashboard', methods=['GET', 'POST'])
+@main.route('/admin_dashboard', methods=['GET', 'POST'])
 @login_required
 def admin_dashboard():
     if current_user.role not in ['master', 'admin']:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     update_admin_code_form = UpdateAdminCodeForm()
     geofence_form = GeofenceForm()
 
     if request.method == 'POST':
         if update_admin_code_form.validate_on_submit():
+            old_admin_code = current_user.admin_code
             current_user.admin_code = update_admin_code_form.new_admin_code.data
             db.session.commit()
+            invalidate_identity(user_ids=[current_user.id], admin_codes=[old_admin_code, current_user.admin_code])
             flash('Admin kod uppdaterad framgångsrikt', 'success')
         elif geofence_form.validate_on_submit():
             new_geofence = Geofence(latitude=geofence_form.latitude.data, longitude=geofence_form.longitude.data, radius=geofence_form.radius.data, admin_id=current_user.id)
             db.session.add(new_geofence)
             db.session.commit()
+            geofence_matcher.invalidate(current_user.id)
             flash('Geofence tillagd framgångsrikt', 'success')
 
     workers = User.query.filter_by(admin_code=current_user.admin_code, role='worker').all()
-    vacations = Vacation.query.filter(Vacation.user_id.in_([worker.id for worker in workers])).all()
+    # Upcoming and ongoing vacations only, unless the admin asks for the full history
+    vacations_from = date.min if request.args.get('vacations') == 'all' else datetime.utcnow().date()
+    vacations = vacations_between(Vacation, [worker.id for worker in workers], vacations_from)
     geofences = Geofence.query.filter_by(admin_id=current_user.id).all()
-    print(f"Geofences in admin_dashboard: {geofences}")
+    worker_totals = current_totals_by_user(db.session, Timestamp, [worker.id for worker in workers])
 
-    timestamps = Timestamp.query.filter(Timestamp.user_id.in_([worker.id for worker in workers])).order_by(Timestamp.clock_in.desc()).all()
+    # Load each row's user in the same statement; the table shows the worker's name per row
+    timestamps = paginate_timestamps(Timestamp.query.options(joinedload(Timestamp.user)).filter(Timestamp.user_id.in_([worker.id for worker in workers])))
 
-    return render_template('admin_dashboard.html', title='Admin Dashboard', workers=workers, vacations=vacations, update_admin_code_form=update_admin_code_form, geofence_form=geofence_form, geofences=geofences, admin_code=current_user.admin_code, timestamps=timestamps)
+    return render_template('admin_dashboard.html', title='Admin Dashboard', workers=workers, vacations=vacations, worker_names={worker.id: f'{worker.first_name} {worker.last_name}' for worker in workers}, update_admin_code_form=update_admin_code_form, geofence_form=geofence_form, geofences=geofences, admin_code=current_user.admin_code, timestamps=timestamps, worker_totals=worker_totals)
 
-@app.route('/view_times/<int:worker_id>', methods=['GET', 'POST'])
+@main.route('/view_times/<int:worker_id>', methods=['GET', 'POST'])
 @login_required
 def view_times(worker_id):
     if current_user.role not in ['master', 'admin']:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     worker = User.query.get(worker_id)
     if not worker or worker.role != 'worker' or worker.admin_code != current_user.admin_code:
         flash('Ogiltig arbetare eller otillräcklig åtkomst', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
+
+    timestamps = paginate_timestamp_history(worker_id)
+    weekly_summaries = WorkSummary.query.filter_by(user_id=worker_id, period='week').order_by(WorkSummary.period_start.desc()).limit(8).all()
+    monthly_totals = worked_time_by_period(db.session, Timestamp, 'month', user_ids=[worker_id], limit=12)
+    return render_template('view_times.html', title=f'Tider för {worker.first_name} {worker.last_name}', worker=worker, timestamps=timestamps, weekly_summaries=weekly_summaries, monthly_totals=monthly_totals)
+
+@main.route('/outside_punches')
+@login_required
+def outside_punches():
+    if current_user.role not in ['master', 'admin']:
+        return redirect(url_for('main.home'))
+
+    today = datetime.utcnow().date()
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else datetime.combine(today - timedelta(days=today.weekday()), datetime.min.time())
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('end') else start + timedelta(days=7)
+    except ValueError:
+        flash('Ogiltigt datumintervall.', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
+
+    workers = {worker.id: worker for worker in User.query.filter_by(admin_code=current_user.admin_code, role='worker')}
+    fences = db.session.query(Geofence.latitude, Geofence.longitude, Geofence.radius).filter_by(admin_id=current_user.id).all()
+    punches = punches_outside_geofences(db.session, Timestamp, fences, list(workers), start, end)
+    return render_template('outside_punches.html', title='Stämplingar utanför geofence', punches=punches, workers=workers, start=start, end=end - timedelta(days=1))
+
+@main.route('/presence')
+@login_required
+def presence_board():
+    if current_user.role not in ['master', 'admin']:
+        return redirect(url_for('main.home'))
+    return render_template('presence.html', title='Incheckade nu', poll_seconds=current_app.config['PRESENCE_POLL_SECONDS'])
+
+@main.route('/presence/snapshot')
+@login_required
+def presence_snapshot():
+    # The polling fallback for boards that were refused a stream
+    if current_user.role not in ['master', 'admin']:
+        return Response(status=403)
+    return jsonify(presence.present(current_user.admin_code))
+
+@main.route('/presence/stream')
+@login_required
+def presence_stream():
+    if current_user.role not in ['master', 'admin']:
+        return Response(status=403)
+    # Each stream holds a request thread; past the cap the board polls /presence/snapshot instead,
+    # so open boards can never take every thread away from clock-ins
+    if not presence.open_stream():
+        return Response(status=503, headers={'Retry-After': str(current_app.config['PRESENCE_POLL_SECONDS'])})
+
+    admin_code = current_user.admin_code
+    max_seconds = current_app.config['PRESENCE_STREAM_MAX_SECONDS']
+    # Loading current_user may have checked out a connection; give it back instead of holding it
+    # (idle in transaction) for the whole stream. Presence reloads use a connection of their own.
+    db.session.remove()
+
+    def sse(event, data):
+        return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+    def generate():
+        # Subscribe before taking the snapshot so no punch falls between the two
+        events = presence.subscribe(admin_code)
+        try:
+            yield 'retry: 5000\n' + sse('snapshot', presence.present(admin_code))
+            # Streams end after a while and the browser reconnects, so a gunicorn worker is never held forever
+            deadline = time.monotonic() + max_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                event = presence.next_event(events, timeout=min(15, remaining))
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield sse(event['type'], event)
+        finally:
+            presence.unsubscribe(admin_code, events)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    # On close rather than in generate(): a client that disconnects before the first chunk never starts it
+    response.call_on_close(presence.close_stream)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@main.route('/edit_timestamp/<int:timestamp_id>', methods=['GET', 'POST'])
+@login_required
+def edit_timestamp(timestamp_id):
+    if current_user.role not in ['master', 'admin']:
+        return redirect(url_for('main.home'))
+
+    timestamp = Timestamp.query.get_or_404(timestamp_id)
+    if timestamp.user.admin_code != current_user.admin_code:
+        flash('Ogiltig arbetare eller otillräcklig åtkomst', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
 
-    timestamps = Timestamp.query.filter_by(user_id=worker_id).order_by(Timestamp.clock_in.desc()).all()
-    return render_template('view_times.html', title=f'Tider för {worker.first_name} {worker.last_name}', worker=worker, timestamps=timestamps)
+    form = EditTimestampForm()
+    if form.validate_on_submit():
+        try:
+            clock_in = datetime.strptime(form.clock_in.data, '%Y-%m-%dT%H:%M')
+            clock_out = datetime.strptime(form.clock_out.data, '%Y-%m-%dT%H:%M')
+            break_duration = int(form.break_duration.data or 0)
+            lunch_duration = int(form.lunch_duration.data or 0)
+        except ValueError:
+            flash('Ogiltigt datum- eller tidsformat.', 'danger')
+            return render_template('edit_timestamp.html', title='Redigera arbetstid', form=form, timestamp=timestamp)
+
+        if clock_out < clock_in:
+            flash('Utcheckning måste vara efter incheckning.', 'danger')
+            return render_template('edit_timestamp.html', title='Redigera arbetstid', form=form, timestamp=timestamp)
+        if break_duration < 0 or lunch_duration < 0:
+            flash(PUNCH_MESSAGES['negative_duration'][0], 'danger')
+            return render_template('edit_timestamp.html', title='Redigera arbetstid', form=form, timestamp=timestamp)
+
+        add_to_work_summary(timestamp.user_id, timestamp.clock_in, -(timestamp.worked_seconds or 0))
+
+        timestamp.clock_in_edited = timestamp.clock_in_edited or clock_in != timestamp.clock_in
+        timestamp.clock_out_edited = timestamp.clock_out_edited or clock_out != timestamp.clock_out
+        timestamp.break_duration_edited = timestamp.break_duration_edited or break_duration != timestamp.break_duration
+        timestamp.lunch_duration_edited = timestamp.lunch_duration_edited or lunch_duration != timestamp.lunch_duration
+        timestamp.edited = True
+        timestamp.clock_in = clock_in
+        timestamp.clock_out = clock_out
+        timestamp.break_duration = break_duration
+        timestamp.lunch_duration = lunch_duration
+        timestamp.worked_seconds = calculate_worked_seconds(clock_in, clock_out, break_duration, lunch_duration)
+
+        add_to_work_summary(timestamp.user_id, timestamp.clock_in, timestamp.worked_seconds)
+        db.session.commit()
+        invalidate_worker_dashboard(timestamp.user_id)
+        presence.refresh()
+        flash('Tidsstämpel uppdaterad framgångsrikt', 'success')
+        return redirect(url_for('main.view_times', worker_id=timestamp.user_id))
+    elif request.method == 'GET':
+        form.break_duration.data = timestamp.break_duration
+        form.lunch_duration.data = timestamp.lunch_duration
+
+    return render_template('edit_timestamp.html', title='Redigera arbetstid', form=form, timestamp=timestamp)
+
+def parse_correction_time(value):
+    # Punches are stored as naive UTC; a value with an offset is converted rather than compared against naive ones
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def read_bulk_corrections():
+    if request.is_json:
+        rows = request.get_json(silent=True)
+        if isinstance(rows, dict):
+            rows = rows.get('corrections')
+    else:
+        upload = request.files.get('file')
+        data = upload.read().decode('utf-8-sig') if upload else request.get_data(as_text=True)
+        rows = list(csv.DictReader(io.StringIO(data)))
+    return rows if isinstance(rows, list) else None
+
+def bulk_edit_response(message, category, status, errors=None):
+    if request.is_json:
+        return jsonify({'message': message, 'errors': errors or []}), status
+    flash(message, category)
+    for error in (errors or [])[:10]:
+        flash(f"Rad {error['row']}: {error['error']}", 'danger')
+    return redirect(url_for('main.admin_dashboard'))
+
+@main.route('/bulk_edit_timestamps', methods=['POST'])
+@login_required
+def bulk_edit_timestamps():
+    if current_user.role not in ['master', 'admin']:
+        return redirect(url_for('main.home'))
+
+    rows = read_bulk_corrections()
+    if not rows:
+        return bulk_edit_response('Inga korrigeringar hittades.', 'danger', 400)
+    if len(rows) > current_app.config['BULK_EDIT_MAX_ROWS']:
+        return bulk_edit_response(f"För många korrigeringar, max {current_app.config['BULK_EDIT_MAX_ROWS']} per gång.", 'danger', 400)
+
+    errors = []
+    ids = []
+    for index, row in enumerate(rows, start=1):
+        try:
+            ids.append(int(row['timestamp_id']))
+        except (KeyError, TypeError, ValueError):
+            errors.append({'row': index, 'error': 'Ogiltigt timestamp_id.'})
+    if len(set(ids)) != len(ids):
+        errors.append({'row': 0, 'error': 'Samma tidsstämpel förekommer flera gånger.'})
+
+    # One query for every referenced punch, restricted to this admin's workers
+    existing = {row.id: row for row in db.session.query(
+        Timestamp.id, Timestamp.user_id, Timestamp.clock_in, Timestamp.clock_out, Timestamp.break_duration,
+        Timestamp.lunch_duration, Timestamp.worked_seconds, Timestamp.clock_in_edited, Timestamp.clock_out_edited,
+        Timestamp.break_duration_edited, Timestamp.lunch_duration_edited,
+    ).join(User, Timestamp.user_id == User.id).filter(Timestamp.id.in_(ids), User.admin_code == current_user.admin_code)}
+
+    updates = []
+    deltas = {}
+    for index, row in enumerate(rows, start=1):
+        try:
+            current = existing.get(int(row['timestamp_id']))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if current is None:
+            errors.append({'row': index, 'error': 'Tidsstämpeln finns inte eller tillhör inte dina arbetare.'})
+            continue
+        try:
+            clock_in = parse_correction_time(row['clock_in']) if row.get('clock_in') else current.clock_in
+            clock_out = parse_correction_time(row['clock_out']) if row.get('clock_out') else current.clock_out
+            break_duration = int(row['break_duration']) if row.get('break_duration') not in (None, '') else current.break_duration
+            lunch_duration = int(row['lunch_duration']) if row.get('lunch_duration') not in (None, '') else current.lunch_duration
+        except (TypeError, ValueError):
+            errors.append({'row': index, 'error': 'Ogiltigt datum-, tids- eller minutvärde.'})
+            continue
+        if clock_out is not None and clock_out < clock_in:
+            errors.append({'row': index, 'error': 'Utcheckning måste vara efter incheckning.'})
+            continue
+        if (break_duration or 0) < 0 or (lunch_duration or 0) < 0:
+            errors.append({'row': index, 'error': PUNCH_MESSAGES['negative_duration'][0]})
+            continue
+
+        worked_seconds = calculate_worked_seconds(clock_in, clock_out, break_duration, lunch_duration)
+        updates.append({
+            'id': current.id,
+            'clock_in': clock_in,
+            'clock_out': clock_out,
+            'break_duration': break_duration,
+            'lunch_duration': lunch_duration,
+            'worked_seconds': worked_seconds,
+            'edited': True,
+            'clock_in_edited': bool(current.clock_in_edited) or clock_in != current.clock_in,
+            'clock_out_edited': bool(current.clock_out_edited) or clock_out != current.clock_out,
+            'break_duration_edited': bool(current.break_duration_edited) or break_duration != current.break_duration,
+            'lunch_duration_edited': bool(current.lunch_duration_edited) or lunch_duration != current.lunch_duration,
+        })
+        for period, period_start in work_summary_periods(current.clock_in):
+            key = (current.user_id, period, period_start)
+            deltas[key] = deltas.get(key, 0) - (current.worked_seconds or 0)
+        for period, period_start in work_summary_periods(clock_in):
+            key = (current.user_id, period, period_start)
+            deltas[key] = deltas.get(key, 0) + (worked_seconds or 0)
+
+    if errors:
+        errors.sort(key=lambda error: error['row'])
+        return bulk_edit_response('Inga ändringar sparades, korrigeringarna innehåller fel.', 'danger', 400, errors)
+
+    # A single executemany UPDATE keyed on the primary key, committed together with the rollup changes
+    db.session.execute(update(Timestamp), updates)
+    apply_work_summary_deltas(deltas)
+    db.session.commit()
+    invalidate_worker_dashboard(*{user_id for user_id, _, _ in deltas})
+    presence.refresh()
+    return bulk_edit_response(f'{len(updates)} tidsstämplar uppdaterade.', 'success', 200)
 
-@app.route('/approve_vacation', methods=['POST'])
+@main.route('/export/timestamps')
+@login_required
+def export_timestamps():
+    if current_user.role not in ['master', 'admin']:
+        return redirect(url_for('main.home'))
+
+    try:
+        start = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d')
+        end = datetime.strptime(request.args.get('end', ''), '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        flash('Ogiltigt datumintervall för export.', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
+
+    # Admins can only export their own workers; the master may pick an admin code or export everything
+    admin_code = request.args.get('admin_code') if current_user.role == 'master' else current_user.admin_code
+    excel = request.args.get('format') == 'excel'
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    def punches_in_range(model):
+        query = select(
+            model.id, User.first_name, User.last_name, model.clock_in, model.clock_out,
+            model.break_duration, model.lunch_duration, model.worked_seconds,
+        ).join(User, model.user_id == User.id).where(model.clock_in >= start, model.clock_in < end)
+        if admin_code:
+            query = query.where(User.admin_code == admin_code, User.role == 'worker')
+        return query
+
+    # Archived months are only read when the range starts at or before the newest archived punch
+    through = archived_through(db.session, TimestampArchive)
+    if through is not None and start <= through:
+        punches = union_all(punches_in_range(Timestamp), punches_in_range(TimestampArchive)).subquery()
+        query = select(punches).order_by(punches.c.clock_in, punches.c.id)
+    else:
+        query = punches_in_range(Timestamp).order_by(Timestamp.clock_in, Timestamp.id)
+    # yield_per streams rows through a server-side cursor instead of buffering the whole result
+    query = query.execution_options(yield_per=batch_size)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';' if excel else ',')
+        if excel:
+            buffer.write('\ufeff')
+        writer.writerow(['id', 'förnamn', 'efternamn', 'incheckning', 'utcheckning', 'rasttid', 'lunchtid', 'arbetad_tid_minuter'])
+        for count, row in enumerate(db.session.execute(query), start=1):
+            writer.writerow([
+                row.id, row.first_name, row.last_name,
+                row.clock_in.strftime('%Y-%m-%d %H:%M:%S'),
+                row.clock_out.strftime('%Y-%m-%d %H:%M:%S') if row.clock_out else '',
+                row.break_duration or 0, row.lunch_duration or 0,
+                row.worked_seconds // 60 if row.worked_seconds is not None else '',
+            ])
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    filename = f"tidsstamplar_{start:%Y-%m-%d}_{end - timedelta(days=1):%Y-%m-%d}.csv"
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@main.route('/approve_vacation', methods=['POST'])
 @login_required
 def approve_vacation():
     if current_user.role not in ['master', 'admin']:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     vacation_id = request.form.get('vacation_id')
     vacation = Vacation.query.get(vacation_id)
     if vacation:
         vacation.status = 'approved'
         db.session.commit()
+        invalidate_worker_dashboard(vacation.user_id)
         flash('Semester godkänd framgångsrikt', 'success')
 
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('main.admin_dashboard'))
 
-@app.route('/decline_vacation', methods=['POST'])
+@main.route('/decline_vacation', methods=['POST'])
 @login_required
 def decline_vacation():
     if current_user.role not in ['master', 'admin']:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     vacation_id = request.form.get('vacation_id')
     vacation = Vacation.query.get(vacation_id)
     if vacation:
         vacation.status = 'declined'
         db.session.commit()
+        invalidate_worker_dashboard(vacation.user_id)
         flash('Semester nekad framgångsrikt', 'success')
 
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('main.admin_dashboard'))
+
+@main.route('/vacation_calendar')
+@login_required
+def vacation_calendar():
+    if current_user.role not in ['master', 'admin']:
+        return redirect(url_for('main.home'))
+
+    try:
+        month = datetime.strptime(request.args['month'], '%Y-%m').date() if request.args.get('month') else datetime.utcnow().date().replace(day=1)
+    except ValueError:
+        flash('Ogiltig månad.', 'danger')
+        return redirect(url_for('main.vacation_calendar'))
+    month_end = (month + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+    workers = {worker.id: worker for worker in User.query.filter_by(admin_code=current_user.admin_code, role='worker')}
+    vacations = vacations_between(Vacation, list(workers), month, month_end, statuses=ACTIVE_STATUSES)
+    return render_template('vacation_calendar.html', title='Semesterkalender', days=days_off(vacations, month, month_end), workers=workers, month=month,
+                           previous_month=(month - timedelta(days=1)).replace(day=1), next_month=month_end + timedelta(days=1), today=datetime.utcnow().date())
 
 # Add the missing endpoint for requesting vacation
-@app.route('/request_vacation', methods=['POST'])
+@main.route('/request_vacation', methods=['POST'])
 @login_required
 def request_vacation():
     if current_user.role != 'worker':
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     vacation_form = VacationRequestForm()
     if vacation_form.validate_on_submit():
+        start_date, end_date = vacation_form.start_date.data, vacation_form.end_date.data
+        if end_date < start_date:
+            flash('Slutdatum måste vara samma dag som eller efter startdatum.', 'danger')
+            return redirect(url_for('main.worker_dashboard'))
+        overlap = find_overlap(Vacation, current_user.id, start_date, end_date)
+        if overlap:
+            flash(f'Perioden överlappar en befintlig ansökan ({overlap.start_date} – {overlap.end_date}).', 'danger')
+            return redirect(url_for('main.worker_dashboard'))
         new_vacation = Vacation(
-            start_date=vacation_form.start_date.data,
-            end_date=vacation_form.end_date.data,
+            start_date=start_date,
+            end_date=end_date,
             user_id=current_user.id,
             status='pending'
         )
         db.session.add(new_vacation)
         db.session.commit()
+        invalidate_worker_dashboard(current_user.id)
         flash('Semesteransökan skickad.', 'success')
-    return redirect(url_for('worker_dashboard'))
+    return redirect(url_for('main.worker_dashboard'))
 
-@app.route('/worker_dashboard', methods=['GET', 'POST'])
+@main.route('/worker_dashboard', methods=['GET', 'POST'])
 @login_required
 def worker_dashboard():
     if current_user.role != 'worker':
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     vacation_form = VacationRequestForm()
-    clocked_in = Timestamp.query.filter_by(user_id=current_user.id, clock_out=None).first()
 
     if request.method == 'POST':
-        if clocked_in:
-            clocked_in.clock_out = datetime.utcnow()
-            clocked_in.lunch_duration = request.form.get('lunch_duration', type=int, default=0)
-            clocked_in.break_duration = request.form.get('break_duration', type=int, default=0)
-            db.session.commit()
-            flash('Du har nu checkat ut.', 'success')
-            clocked_in = None  # Update clocked_in to reflect the new state
-        else:
-            lat = request.form.get('latitude')
-            lon = request.form.get('longitude')
-
-            if not lat or not lon:
-                flash('Misslyckades med att hämta platsinformation. Vänligen försök igen.', 'danger')
-                return redirect(url_for('worker_dashboard'))
-
-            user_location = (float(lat), float(lon))
-
-            worker_admin = User.query.filter_by(admin_code=current_user.admin_code, role='admin').first()
-            if not worker_admin:
-                flash('Ingen administratör hittades för att kontrollera geofences.', 'danger')
-                return redirect(url_for('worker_dashboard'))
-
-            geofences = Geofence.query.filter_by(admin_id=worker_admin.id).all()
-            clock_in_allowed = False
-            for geofence in geofences:
-                geofence_location = (geofence.latitude, geofence.longitude)
-                distance = geodesic(user_location, geofence_location).meters
-                if distance <= geofence.radius:
-                    clock_in_allowed = True
-                    new_timestamp = Timestamp(user_id=current_user.id)
-                    db.session.add(new_timestamp)
-                    db.session.commit()
-                    flash('Du har nu checkat in.', 'success')
-                    return redirect(url_for('worker_dashboard'))
-
-            if not clock_in_allowed:
-                flash('Du är för långt från tillåtet område för att checka in.', 'danger')
+        result = record_punch(
+            current_user,
+            action=request.form.get('action'),
+            location=read_location(),
+            punch_key=request.form.get('punch_key'),
+            timestamp_id=request.form.get('timestamp_id', type=int),
+            break_duration=request.form.get('break_duration', type=int, default=0),
+            lunch_duration=request.form.get('lunch_duration', type=int, default=0),
+        )
+        flash(*PUNCH_MESSAGES[result])
+        return redirect(url_for('main.worker_dashboard'))
 
-    timestamps = Timestamp.query.filter_by(user_id=current_user.id).order_by(Timestamp.clock_in.desc()).all()
-    vacations = Vacation.query.filter_by(user_id=current_user.id).all()
+    # Only the first page is cached; older/newer pages are rare and go straight to the database
+    if request.args.get('before') or request.args.get('after'):
+        dashboard = load_worker_dashboard(current_user.id)
+    else:
+        dashboard = dashboard_cache.get_or_set(f'worker_dashboard:{current_user.id}', lambda: load_worker_dashboard(current_user.id))
 
-    return render_template('worker_dashboard.html', title='Worker Dashboard', vacation_form=vacation_form, clocked_in=clocked_in, timestamps=timestamps, vacations=vacations)
+    return render_template('worker_dashboard.html', title='Worker Dashboard', vacation_form=vacation_form, punch_key=uuid4().hex, clocked_in=dashboard['clocked_in'], timestamps=dashboard['timestamps'], vacations=dashboard['vacations'])
 
 
 
-@app.route('/delete_worker/<int:worker_id>', methods=['POST'])
+@main.route('/delete_worker/<int:worker_id>', methods=['POST'])
 @login_required
 def delete_worker(worker_id):
     worker = User.query.get_or_404(worker_id)
     db.session.delete(worker)
     db.session.commit()
+    invalidate_worker_dashboard(worker_id)
+    invalidate_identity(user_ids=[worker_id])
+    presence.refresh()
     flash('Arbetare borttagen', 'success')
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('main.admin_dashboard'))
 
 
-@app.route('/delete_geofence/<int:geofence_id>', methods=['POST'])
+@main.route('/delete_geofence/<int:geofence_id>', methods=['POST'])
 @login_required
 def delete_geofence(geofence_id):
     if current_user.role not in ['master', 'admin']:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     geofence = Geofence.query.get(geofence_id)
     if geofence and geofence.admin_id == current_user.id:
         db.session.delete(geofence)
         db.session.commit()
+        geofence_matcher.invalidate(current_user.id)
         flash('Geofence borttagen framgångsrikt', 'success')
 
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('main.admin_dashboard'))
+
+def load_punch_status(user_id):
+    clocked_in = db.session.query(Timestamp.id, Timestamp.clock_in).filter_by(user_id=user_id, clock_out=None).first()
+    return {
+        'clocked_in': clocked_in is not None,
+        'timestamp_id': clocked_in.id if clocked_in else None,
+        'clock_in': clocked_in.clock_in.isoformat() if clocked_in else None,
+    }
+
+def punch_status(user_id):
+    # A 304 must mean nothing changed, so the status only comes from the cache when the backend is shared:
+    # the in-process one misses punches handled by other workers until CACHE_TTL. Without it this is a
+    # single probe of the open-punch index.
+    if not dashboard_cache.shared:
+        return load_punch_status(user_id)
+    return dashboard_cache.get_or_set(f'punch_status:{user_id}', lambda: load_punch_status(user_id))
+
+def timestamp_to_json(timestamp):
+    return {
+        'id': timestamp.id,
+        'clock_in': timestamp.clock_in.isoformat(),
+        'clock_out': timestamp.clock_out.isoformat() if timestamp.clock_out else None,
+        'worked_seconds': timestamp.worked_seconds,
+        'break_duration': timestamp.break_duration,
+        'lunch_duration': timestamp.lunch_duration,
+    }
+
+def conditional_json(payload):
+    # Clients poll with If-None-Match; an unchanged payload costs a 304 with no body
+    response = jsonify(payload)
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+PUNCH_STATUS_CODES = {'clocked_in': 201, 'clocked_out': 200, 'duplicate': 200, 'stale': 409, 'negative_duration': 400, 'no_location': 400, 'no_admin': 409, 'outside_clock_in': 403, 'outside_clock_out': 403}
+
+@api.before_request
+def require_worker():
+    # JSON errors instead of the login redirect the HTML routes use
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'unauthorized'}), 401
+    if current_user.role != 'worker':
+        return jsonify({'error': 'forbidden'}), 403
+
+@api.route('/status')
+def api_status():
+    return conditional_json(punch_status(current_user.id))
+
+@api.route('/timestamps')
+def api_timestamps():
+    page = paginate_keyset(Timestamp.query.filter_by(user_id=current_user.id), Timestamp.clock_in, Timestamp.id,
+                           before=request.args.get('cursor'), after=None, per_page=current_app.config['TIMESTAMPS_PER_PAGE'])
+    return conditional_json({'items': [timestamp_to_json(timestamp) for timestamp in page], 'next_cursor': page.older_cursor})
+
+@api.route('/punch', methods=['POST'])
+def api_punch():
+    # JSON only: a cross-site HTML form cannot send application/json, which stands in for a CSRF token here
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'expected a JSON object'}), 400
+    try:
+        timestamp_id, break_duration, lunch_duration = (int(data[key]) if data.get(key) is not None else None for key in ('timestamp_id', 'break_duration', 'lunch_duration'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'timestamp_id, break_duration and lunch_duration must be integers'}), 400
+    result = record_punch(current_user, data.get('action'), read_location(data), punch_key=data.get('punch_key'),
+                          timestamp_id=timestamp_id, break_duration=break_duration, lunch_duration=lunch_duration)
+    status = punch_status(current_user.id)
+    return jsonify({'result': result, 'message': PUNCH_MESSAGES[result][0], 'status': status}), PUNCH_STATUS_CODES[result]
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5000)
+    create_app().run(host="0.0.0.0", port=5000)
@@ -0,0 +1,84 @@
+"""Moving closed months of punches out of the live timestamp table.
+
+Dashboards and punches only ever touch recent rows, so months older than the
+retention window are moved to timestamp_archive, which keeps the live table and
+its indexes small. On Postgres the archive is range partitioned by month of
+clock_in, one partition per month; SQLite has no partitioning and uses a single
+archive table. Open punches are never moved, so the one-open-punch constraint on
+the live table keeps covering them.
+"""
+from datetime import datetime
+from sqlalchemy import delete, func, insert, select, text
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    month = value.year * 12 + value.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def archive_cutoff(keep_months, today=None):
+    """The first clock_in that stays live: the start of the month `keep_months` before the current one."""
+    return add_months(month_start(today or datetime.utcnow()), -keep_months)
+
+
+def ensure_partitions(session, archive_model, first, last):
+    """Create the archive's monthly partitions from `first` through `last` on Postgres; returns their names."""
+    if session.get_bind().dialect.name != 'postgresql':
+        return []
+    parent = archive_model.__table__.name
+    names = []
+    month = month_start(first)
+    while month <= last:
+        name = f'{parent}_{month:%Y_%m}'
+        session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+        ))
+        names.append(name)
+        month = add_months(month, 1)
+    session.commit()
+    return names
+
+
+def archive_before(session, timestamp_model, archive_model, cutoff, batch_size=1000):
+    """Move closed punches with clock_in before `cutoff` to the archive; returns {month: rows moved}.
+
+    Rows move in primary-key batches, each copied and deleted in one committed
+    transaction, so locks are short and an interrupted run can simply be repeated.
+    """
+    live = timestamp_model.__table__
+    archive = archive_model.__table__
+    closed = (live.c.clock_out.isnot(None), live.c.clock_in < cutoff)
+    oldest = session.execute(select(func.min(live.c.clock_in)).where(*closed)).scalar()
+    if oldest is None:
+        return {}
+    ensure_partitions(session, archive_model, oldest, add_months(cutoff, -1))
+
+    columns = [column.name for column in archive.columns]
+    moved = {}
+    month = month_start(oldest)
+    while month < cutoff:
+        in_month = (*closed, live.c.clock_in >= month, live.c.clock_in < add_months(month, 1))
+        while True:
+            ids = session.execute(select(live.c.id).where(*in_month).order_by(live.c.id).limit(batch_size)).scalars().all()
+            if not ids:
+                break
+            session.execute(insert(archive).from_select(columns, select(*(live.c[name] for name in columns)).where(live.c.id.in_(ids))))
+            session.execute(delete(live).where(live.c.id.in_(ids)))
+            session.commit()
+            moved[month] = moved.get(month, 0) + len(ids)
+        month = add_months(month, 1)
+    return moved
+
+
+def archived_through(session, archive_model):
+    """The latest archived clock_in, or None when nothing has been archived.
+
+    Every archived row is at or before this, so a query whose range starts after it
+    can skip the archive entirely.
+    """
+    return session.execute(select(func.max(archive_model.clock_in))).scalar()
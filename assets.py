@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import urllib.request
+from base64 import b64encode
+import click
+from flask import abort, current_app, request, send_from_directory, url_for
+
+MANIFEST = 'manifest.json'
+ONE_YEAR = 365 * 24 * 3600
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+# Third-party files served from our own origin instead of a CDN. `flask assets build` downloads
+# any that are missing into static/ and checks them against the published SRI hash.
+VENDOR_FILES = {
+    'vendor/bootstrap-4.3.1.min.css': (
+        'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css',
+        'sha384-ggOyR0iXCbMQv3Xipma34MD+dH/1fQ784/j6cY/iJTQUOhcWr7x9JvoRxT2MZw1T',
+    ),
+    'vendor/bootstrap-4.3.1.min.js': (
+        'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/js/bootstrap.min.js',
+        'sha384-JjSmVgyd0p3pXB1rRibZUAYoIIy6OrQ6VrjIEaFf/nJGzIxFDsf4x0xIM+B07jRM',
+    ),
+    'vendor/jquery-3.3.1.slim.min.js': (
+        'https://code.jquery.com/jquery-3.3.1.slim.min.js',
+        'sha384-q8i/X+965DzO0rT7abK41JStQIAqVgRVzpbzo5smXKp4YfRvH+8abtTE1Pi6jizo',
+    ),
+    'vendor/popper-1.14.7.min.js': (
+        'https://cdnjs.cloudflare.com/ajax/libs/popper.js/1.14.7/umd/popper.min.js',
+        'sha384-UO2eT0CpHqdSJQ6hJty5KVphtPhzWj9WO1clHTMGa3JDZwrnQq4sF86dIHNDz0W1',
+    ),
+}
+
+
+class Assets:
+    """Content-hashed static files with precompressed variants.
+
+    `flask assets build` copies every file under static/ to static/dist/ with a hash of
+    its content in the name, writes .gz (and .br when the brotli package is installed)
+    next to each text file, and records the mapping in static/dist/manifest.json.
+    Templates call asset_url('styles.css'); hashed files are served from /assets/ with
+    a one-year immutable Cache-Control, so browsers never revalidate them. Without a
+    build, asset_url falls back to the plain static URL, or to the CDN for vendor
+    files that have not been downloaded yet.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.dist_folder = os.path.join(app.static_folder, 'dist')
+        self.manifest = self._load_manifest()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.asset_url)
+        app.cli.add_command(assets_cli)
+        app.extensions['assets'] = self
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.dist_folder, MANIFEST)) as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            return {}
+
+    def asset_url(self, filename):
+        hashed = self.manifest.get(filename)
+        if hashed:
+            return url_for('assets', filename=hashed)
+        if filename in VENDOR_FILES and not os.path.exists(os.path.join(self.static_folder, filename)):
+            return VENDOR_FILES[filename][0]
+        return url_for('static', filename=filename)
+
+    def serve(self, filename):
+        if filename == MANIFEST or filename.endswith(('.gz', '.br')):
+            abort(404)
+        accepted = request.accept_encodings
+        served, encoding = filename, None
+        for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+            if accepted[name] and os.path.isfile(os.path.join(self.dist_folder, filename + suffix)):
+                served, encoding = filename + suffix, name
+                break
+        response = send_from_directory(self.dist_folder, served, mimetype=mimetypes.guess_type(filename)[0], max_age=ONE_YEAR)
+        response.cache_control.immutable = True
+        response.cache_control.public = True
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.content_encoding = encoding
+        return response
+
+    def build(self, fetch=True):
+        """Regenerate static/dist and its manifest; returns the manifest."""
+        if fetch:
+            for filename, (url, integrity) in VENDOR_FILES.items():
+                fetch_vendor_file(os.path.join(self.static_folder, filename), url, integrity)
+
+        if os.path.isdir(self.dist_folder):
+            shutil.rmtree(self.dist_folder)
+        os.makedirs(self.dist_folder)
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+
+        manifest = {}
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != self.dist_folder]
+            for name in sorted(files):
+                source = os.path.join(root, name)
+                logical = os.path.relpath(source, self.static_folder).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    content = f.read()
+                stem, extension = os.path.splitext(logical)
+                hashed = f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+                target = os.path.join(self.dist_folder, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(content)
+                if extension in COMPRESSIBLE:
+                    # mtime=0 keeps the .gz byte-identical between builds of the same content
+                    _write_if_smaller(target + '.gz', gzip.compress(content, compresslevel=9, mtime=0), content)
+                    if brotli is not None:
+                        _write_if_smaller(target + '.br', brotli.compress(content, quality=11), content)
+                manifest[logical] = hashed
+
+        with open(os.path.join(self.dist_folder, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        self.manifest = manifest
+        return manifest
+
+
+def _write_if_smaller(path, compressed, original):
+    if len(compressed) < len(original):
+        with open(path, 'wb') as f:
+            f.write(compressed)
+
+
+def fetch_vendor_file(path, url, integrity):
+    if os.path.exists(path):
+        return
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+    except OSError as e:
+        raise click.ClickException(f'Could not download {url} ({e}); use --no-fetch to keep loading it from the CDN')
+    algorithm, expected = integrity.split('-', 1)
+    if b64encode(hashlib.new(algorithm, content).digest()).decode() != expected:
+        raise click.ClickException(f'{url} does not match its published integrity hash')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    click.echo(f'Downloaded {url}')
+
+
+@click.group('assets')
+def assets_cli():
+    """Fingerprinted static assets."""
+
+
+@assets_cli.command('build')
+@click.option('--no-fetch', is_flag=True, help='Do not download missing vendor files.')
+def build_command(no_fetch):
+    """Hash, compress and index everything under static/ into static/dist/."""
+    manifest = current_app.extensions['assets'].build(fetch=not no_fetch)
+    click.echo(f'Built {len(manifest)} assets into static/dist/')
@@ -0,0 +1,71 @@
+"""Compare the per-fence geodesic loop with the vectorized haversine kernel.
+
+For 10, 100 and 1000 fences scattered around a site, times one lookup with
+  geodesic loop  - geopy.distance.geodesic to every fence, as the punch check used to do
+  haversine loop - scalar haversine_meters to every fence
+  pointset       - distance.PointSet, pure Python arrays
+  pointset numpy - distance.PointSet with NumPy (skipped when NumPy is not installed)
+  index          - GeofenceIndex.contains, the grid index the punch routes use
+and prints the mean microseconds per lookup plus the largest haversine/geodesic difference.
+
+    python benchmark_geofence_distance.py --lookups 200
+"""
+import argparse
+import random
+import time
+from geopy.distance import geodesic
+import distance
+from distance import PointSet, haversine_meters
+from geofencing import GeofenceIndex
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--fences', type=int, nargs='+', default=[10, 100, 1000])
+parser.add_argument('--lookups', type=int, default=200, help='query points per fence count')
+parser.add_argument('--spread', type=float, default=0.5, help='degrees around the site that fences and points are drawn from')
+parser.add_argument('--seed', type=int, default=1)
+args = parser.parse_args()
+
+SITE = (59.3293, 18.0686)
+random.seed(args.seed)
+
+
+def random_point():
+    return SITE[0] + random.uniform(-args.spread, args.spread), SITE[1] + random.uniform(-args.spread, args.spread)
+
+
+def per_lookup_us(function, points):
+    start = time.perf_counter()
+    for point in points:
+        function(point)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+
+for count in args.fences:
+    fences = [(*random_point(), random.uniform(50, 500)) for _ in range(count)]
+    centres = [(lat, lon) for lat, lon, _ in fences]
+    points = [random_point() for _ in range(args.lookups)]
+
+    candidates = {
+        'geodesic loop': lambda point: [geodesic(point, centre).meters for centre in centres],
+        'haversine loop': lambda point: [haversine_meters(point, centre) for centre in centres],
+        'pointset': PointSet(centres, use_numpy=False).distances_from,
+    }
+    if distance.load_numpy() is not None:
+        candidates['pointset numpy'] = PointSet(centres, use_numpy=True).distances_from
+    index = GeofenceIndex(fences)
+    candidates['index'] = index.contains
+
+    # geodesic is by far the slowest; a smaller sample keeps large fence counts quick
+    geodesic_points = points[:max(10, args.lookups // 10)]
+    results = {label: per_lookup_us(function, geodesic_points if label == 'geodesic loop' else points) for label, function in candidates.items()}
+
+    kernel = PointSet(centres)
+    worst = max(
+        abs(vectorized - geodesic(point, centre).meters) / geodesic(point, centre).meters
+        for point in geodesic_points
+        for vectorized, centre in zip(kernel.distances_from(point), centres)
+    )
+
+    print(f'{count} fences (max haversine vs geodesic difference {worst * 100:.3f}%)')
+    for label, micros in results.items():
+        print(f'  {label:<16} {micros:12.1f} us/lookup   {results["geodesic loop"] / micros:8.1f}x')
@@ -0,0 +1,171 @@
+"""Measure login and the dashboards end to end at growing data sizes.
+
+For each --scales size the database is reset and filled by seed_data (a temporary
+SQLite file unless --database-url is given), then every route is driven through
+Flask's test client. Per route it records p50/p95 latency, the SQL statements one
+request issues and the peak Python memory allocated while serving it. Caches are
+disabled unless --cached is given, so every request reaches the database.
+
+Results are written as JSON to --output. --compare reads an earlier results file
+and exits non-zero when a route at a scale present in both is more than
+--tolerance slower at p50 or issues more queries than before.
+
+    python benchmark_routes.py --scales 1000 100000 1000000 --samples 20
+    python benchmark_routes.py --scales 1000 100000 --compare benchmark_results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--scales', type=int, nargs='+', default=[1000, 100000, 1000000], help='punches in the database')
+parser.add_argument('--samples', type=int, default=20, help='timed requests per route and scale')
+parser.add_argument('--database-url', default=None, help='defaults to a temporary SQLite file; the database is dropped and recreated')
+parser.add_argument('--cached', action='store_true', help='keep the dashboard, identity and login caches enabled')
+parser.add_argument('--output', default=None, help='defaults to benchmark_results/routes-<date>.json')
+parser.add_argument('--compare', default=None, help='earlier results file to check for regressions')
+parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown against --compare, as a fraction')
+args = parser.parse_args()
+
+os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+if not args.cached:
+    for variable in ('CACHE_TTL', 'IDENTITY_CACHE_TTL', 'LOGIN_CACHE_TTL'):
+        os.environ[variable] = '0'
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app, password_manager  # noqa: E402
+from models import db  # noqa: E402
+from seed_data import PASSWORD, seed  # noqa: E402
+
+app = create_app()  # reads DATABASE_URL, so it must come after the environment is set
+app.config['WTF_CSRF_ENABLED'] = False
+
+statements = 0
+
+
+def count_statement(*_):
+    global statements
+    statements += 1
+
+
+def logged_in_client(first_name, last_name):
+    client = app.test_client()
+    response = client.post('/login', data={'first_name': first_name, 'last_name': last_name, 'password': PASSWORD})
+    if response.status_code != 302:
+        sys.exit(f'Could not log in as {first_name} {last_name}')
+    return client
+
+
+def routes(users):
+    admin = logged_in_client(*users['admin'])
+    worker = logged_in_client(*users['worker'])
+    login_form = {'first_name': users['worker'][0], 'last_name': users['worker'][1], 'password': PASSWORD}
+    return {
+        # A fresh client each time, so every request is a real login rather than a redirect
+        'login': lambda: app.test_client().post('/login', data=login_form),
+        'worker_dashboard': lambda: worker.get('/worker_dashboard'),
+        'admin_dashboard': lambda: admin.get('/admin_dashboard'),
+        'view_times': lambda: admin.get(f'/view_times/{users["worker_id"]}'),
+    }
+
+
+def measure(route, request):
+    global statements
+    request()  # warm-up: template compilation, first connection
+    timings, queries = [], []
+    for _ in range(args.samples):
+        statements = 0
+        start = time.perf_counter()
+        response = request()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(statements)
+        # Only login is expected to redirect; anywhere else a redirect means the request was turned away
+        if response.status_code != (302 if route == 'login' else 200):
+            sys.exit(f'{route} answered {response.status_code}')
+
+    # A separate pass, since tracing every allocation distorts the timings
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    request()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    percentiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    return {
+        'p50_ms': round(percentiles[49], 3),
+        'p95_ms': round(percentiles[94], 3),
+        'queries': int(statistics.median(queries)),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = 0
+    print(f'\nCompared with {baseline_path}:')
+    for scale, scale_results in results.items():
+        for route, now in scale_results.items():
+            before = baseline.get(scale, {}).get(route)
+            if before is None:
+                continue
+            change = now['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0.0
+            slower = change > args.tolerance
+            more_queries = now['queries'] > before['queries']
+            regressions += slower or more_queries
+            flag = '  REGRESSION' if slower or more_queries else ''
+            print(f'  {scale:>8} {route:<18} p50 {before["p50_ms"]:8.1f} -> {now["p50_ms"]:8.1f} ms ({change:+.0%})   '
+                  f'queries {before["queries"]:3d} -> {now["queries"]:3d}{flag}')
+    return regressions
+
+
+def seed_scale(scale):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        return seed(db.session, scale, password_hash)
+
+
+with app.app_context():
+    engine = db.engine
+    password_hash = password_manager.hash(PASSWORD)
+event.listen(engine, 'before_cursor_execute', count_statement)
+
+# Requests run outside any app context of our own: a shared one would share flask.g, and with it
+# Flask-Login's current user, between the admin and worker clients
+results = {}
+for scale in args.scales:
+    started = time.perf_counter()
+    users = seed_scale(scale)
+    print(f'{scale} punches ({users["workers"]} workers, {users["admins"]} admins), seeded in {time.perf_counter() - started:.1f}s')
+
+    results[str(scale)] = {}
+    for route, request in routes(users).items():
+        result = results[str(scale)][route] = measure(route, request)
+        print(f'  {route:<18} p50 {result["p50_ms"]:8.1f} ms   p95 {result["p95_ms"]:8.1f} ms   '
+              f'{result["queries"]:3d} queries   peak {result["peak_kib"]:9.1f} KiB')
+
+output = args.output or os.path.join('benchmark_results', f'routes-{datetime.now():%Y%m%d-%H%M%S}.json')
+os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+with open(output, 'w') as f:
+    json.dump({
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'database': engine.dialect.name,
+        'python': platform.python_version(),
+        'samples': args.samples,
+        'cached': args.cached,
+        'results': results,
+    }, f, indent=2)
+print(f'\nResults written to {output}')
+
+if args.compare and compare(results, args.compare):
+    print('\nFAIL: routes regressed against the baseline')
+    sys.exit(1)
@@ -0,0 +1,77 @@
+"""Time a cold import of the app and fail when it exceeds the startup budget.
+
+Every `flask db` command, every gunicorn master and every script pays for importing
+app.py, so this keeps an eye on what that import drags in. Each measurement runs in
+a fresh interpreter; the median of --runs is compared against --budget-ms and the
+script exits non-zero when it is over.
+
+    python benchmark_startup.py --runs 7 --budget-ms 800
+    python benchmark_startup.py --importtime    # per-module breakdown of the slowest imports
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--runs', type=int, default=5)
+parser.add_argument('--budget-ms', type=float, default=800, help='maximum median time for `import app`')
+parser.add_argument('--importtime', action='store_true', help='print the ten slowest modules imported by app')
+args = parser.parse_args()
+
+STAGES = {
+    'import models': 'import models',
+    'import app': 'import app',
+    'import app + create_app()': 'import app; app.create_app()',
+}
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{code}
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def measure(code):
+    timings = []
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, '-c', TIMER.format(code=code)], capture_output=True, text=True, check=True)
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def slowest_imports(limit=10):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], capture_output=True, text=True, check=True)
+    rows = []
+    children = []
+    # Modules are listed after their own imports, indented two spaces per nesting level
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), module.strip()))
+        elif depth == 0:
+            if module.strip() == 'app':
+                rows = children
+            children = []
+    return sorted(rows, reverse=True)[:limit]
+
+
+results = {}
+for label, code in STAGES.items():
+    timings = measure(code)
+    results[label] = statistics.median(timings)
+    print(f'{label:<28} median {results[label]:8.1f} ms   min {min(timings):8.1f} ms   max {max(timings):8.1f} ms')
+
+if args.importtime:
+    print('\nSlowest imports from app.py (cumulative):')
+    for cumulative, module in slowest_imports():
+        print(f'  {cumulative / 1000:8.1f} ms  {module}')
+
+if results['import app'] > args.budget_ms:
+    print(f'\nFAIL: importing app took {results["import app"]:.1f} ms, budget is {args.budget_ms:.0f} ms')
+    sys.exit(1)
+print(f'\nOK: importing app is within the {args.budget_ms:.0f} ms budget')
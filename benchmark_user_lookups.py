@@ -0,0 +1,86 @@
+"""Time the user lookups behind login, register and the dashboards with and without indexes.
+
+Seeds N users into a throwaway database (a temporary SQLite file unless
+--database-url is given), runs each lookup with the user indexes dropped and
+again after recreating them, and prints p50/p99 latencies in milliseconds.
+
+    python benchmark_user_lookups.py --users 50000 --samples 500
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--users', type=int, default=20000)
+parser.add_argument('--admins', type=int, default=200)
+parser.add_argument('--samples', type=int, default=300)
+parser.add_argument('--database-url', default=None, help='defaults to a temporary SQLite file; the database is dropped and recreated')
+args = parser.parse_args()
+
+os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+
+from app import create_app  # noqa: E402
+from models import db, User  # noqa: E402
+
+app = create_app()  # reads DATABASE_URL, so it must come after the environment is set
+
+USER_INDEXES = [index for index in User.__table__.indexes]
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    rows = [
+        {'first_name': f'Admin{i}', 'last_name': 'Bench', 'password': 'x', 'role': 'admin', 'admin_code': f'code{i}'}
+        for i in range(args.admins)
+    ]
+    rows += [
+        {'first_name': f'Worker{i}', 'last_name': f'Bench{i % 97}', 'password': 'x', 'role': 'worker', 'admin_code': f'code{i % args.admins}'}
+        for i in range(args.users)
+    ]
+    db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+
+
+def measure(label, query):
+    timings = []
+    for _ in range(args.samples):
+        start = time.perf_counter()
+        query()
+        timings.append((time.perf_counter() - start) * 1000)
+        db.session.rollback()
+    percentiles = statistics.quantiles(timings, n=100)
+    print(f'  {label:<28} p50 {percentiles[49]:8.3f} ms   p99 {percentiles[98]:8.3f} ms')
+
+
+def random_worker_name():
+    worker = random.randrange(args.users)
+    return {'first_name': f'Worker{worker}', 'last_name': f'Bench{worker % 97}'}
+
+
+def random_admin_code():
+    return f'code{random.randrange(args.admins)}'
+
+
+def run_queries():
+    measure('login (first/last name)', lambda: User.query.filter_by(**random_worker_name()).first())
+    measure('admin by admin_code', lambda: User.query.filter_by(admin_code=random_admin_code(), role='admin').first())
+    measure('dashboard worker list', lambda: User.query.filter_by(admin_code=random_admin_code(), role='worker').all())
+
+
+with app.app_context():
+    print(f'Seeding {args.users} workers and {args.admins} admins into {db.engine.url.render_as_string()}')
+    seed()
+
+    for index in USER_INDEXES:
+        index.drop(db.engine)
+    print('Without indexes:')
+    run_queries()
+
+    for index in USER_INDEXES:
+        index.create(db.engine)
+    print('With indexes:')
+    run_queries()
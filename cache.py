@@ -0,0 +1,123 @@
+import pickle
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry expiry, local to one process."""
+
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Any Redis-protocol server; shared by all worker processes, so invalidation is global."""
+
+    shared = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_URL points at Redis but the redis package is not installed')
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._client.get(key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def __len__(self):
+        return self._client.dbsize()
+
+
+class Cache:
+    """Read-through cache with hit/miss counters.
+
+    CACHE_URL selects the backend: empty for the in-process LRU, redis:// or
+    rediss:// for a Redis-compatible server. The in-process backend is only
+    invalidated in the process that made the change, so CACHE_TTL bounds how
+    stale other gunicorn workers can be.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('CACHE_URL')
+        self.ttl = app.config.get('CACHE_TTL', 15)
+        if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+            self.backend = RedisBackend(url)
+        else:
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+    def get_or_set(self, key, loader):
+        value = self.backend.get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            value = loader()
+            self.backend.set(key, value, self.ttl)
+        return value
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    @property
+    def shared(self):
+        """Whether every worker process sees the same entries, and so every invalidation."""
+        return self.backend.shared
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -6,3 +6,47 @@ class Config:
     # Use DATABASE_URL environment variable if available, otherwise fallback to SQLite
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+def presence_max_streams():
+    """How many live presence streams one process serves at a time (PRESENCE_MAX_STREAMS).
+
+    A stream holds its request thread for up to PRESENCE_STREAM_MAX_SECONDS, so threaded
+    workers (gunicorn.conf.py exports GUNICORN_THREADS) default to half their threads and
+    keep the rest for punches; a sync worker with one thread serves none. Under gevent a
+    stream is only a greenlet.
+    """
+    threads = int(os.environ.get('GUNICORN_THREADS', 0))
+    return int(os.environ.get('PRESENCE_MAX_STREAMS', threads // 2 if threads else 100))
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URI, tunable through the environment.
+
+    Pool sizes default to an even share of DB_MAX_CONNECTIONS (the plan's connection
+    limit) across the gunicorn workers (WEB_CONCURRENCY), so all workers together can
+    never exhaust the server, and to no more than the worker's threads (GUNICORN_THREADS).
+    """
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+    if not uri.startswith('postgresql'):
+        return options
+
+    workers = max(int(os.environ.get('WEB_CONCURRENCY', 2)), 1)
+    per_worker = max(int(os.environ.get('DB_MAX_CONNECTIONS', 20)) // workers, 1)
+    # A threaded worker never uses more connections than it has request threads (gunicorn.conf.py
+    # exports GUNICORN_THREADS for sync and gthread workers; gevent workers share the full quota)
+    threads = int(os.environ.get('GUNICORN_THREADS', 0))
+    if threads:
+        per_worker = min(per_worker, threads)
+    options['pool_size'] = int(os.environ.get('DB_POOL_SIZE', per_worker))
+    options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', 0))
+    options['pool_timeout'] = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    # Heroku-style Postgres and most proxies drop idle connections after a few minutes
+    options['pool_recycle'] = int(os.environ.get('DB_POOL_RECYCLE', 280))
+
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
@@ -0,0 +1,90 @@
+"""Great-circle distances from one point to many.
+
+PointSet precomputes radians and cosines for a fixed set of points (an admin's fence
+centres) and then measures all of them from a query point in a single pass. NumPy is
+used when it is installed; otherwise the same arithmetic runs over plain arrays, which
+is slower but needs nothing beyond the standard library. NumPy is only imported by
+the first PointSet large enough to use it, since importing it at startup would cost
+every `import app` about 70 ms.
+"""
+from array import array
+from math import asin, cos, radians, sin, sqrt
+
+numpy = None
+_numpy_checked = False
+
+EARTH_RADIUS_METERS = 6371008.8
+# Below this many points the per-call overhead of NumPy outweighs the vectorized arithmetic
+NUMPY_MIN_POINTS = 10
+
+
+def load_numpy():
+    """The numpy module, imported on first call, or None when it is not installed."""
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy, _numpy_checked = module, True
+    return numpy
+
+
+def haversine_meters(point_a, point_b):
+    lat1, lon1 = map(radians, point_a)
+    lat2, lon2 = map(radians, point_b)
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * asin(min(1.0, sqrt(a)))
+
+
+class PointSet:
+    """Fixed (latitude, longitude) points prepared for repeated distance queries."""
+
+    def __init__(self, points, use_numpy=None):
+        # None picks by size; True or False forces a backend (True still needs NumPy installed)
+        if use_numpy is None:
+            use_numpy = len(points) >= NUMPY_MIN_POINTS
+        self.numpy = bool(use_numpy) and load_numpy() is not None
+        latitudes = [radians(lat) for lat, _ in points]
+        longitudes = [radians(lon) for _, lon in points]
+        if self.numpy:
+            self._lat = numpy.array(latitudes, dtype=float)
+            self._lon = numpy.array(longitudes, dtype=float)
+            self._cos_lat = numpy.cos(self._lat)
+        else:
+            self._lat = array('d', latitudes)
+            self._lon = array('d', longitudes)
+            self._cos_lat = array('d', map(cos, latitudes))
+
+    def __len__(self):
+        return len(self._lat)
+
+    def as_array(self, values):
+        """Per-point values (e.g. radii) in the representation distances_from() returns."""
+        return numpy.array(values, dtype=float) if self.numpy else array('d', values)
+
+    def distances_from(self, point):
+        """Haversine distance in meters from `point` to every point in the set, in set order."""
+        lat, lon = map(radians, point)
+        cos_lat = cos(lat)
+        if self.numpy:
+            a = numpy.sin((self._lat - lat) / 2) ** 2 + cos_lat * self._cos_lat * numpy.sin((self._lon - lon) / 2) ** 2
+            return 2 * EARTH_RADIUS_METERS * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+        return array('d', (
+            2 * EARTH_RADIUS_METERS * asin(sqrt(min(1.0, sin((other_lat - lat) / 2) ** 2 + cos_lat * other_cos * sin((other_lon - lon) / 2) ** 2)))
+            for other_lat, other_lon, other_cos in zip(self._lat, self._lon, self._cos_lat)
+        ))
+
+
+def any_within(distances, limits):
+    """True if some distance is at most the limit at the same position."""
+    # Until a PointSet has loaded NumPy, `numpy` is None and no distances can be an ndarray
+    if numpy is not None and isinstance(distances, numpy.ndarray):
+        return bool((distances <= limits).any())
+    return any(distance <= limit for distance, limit in zip(distances, limits))
+
+
+def indexes_within(distances, limits):
+    if numpy is not None and isinstance(distances, numpy.ndarray):
+        return numpy.flatnonzero(distances <= limits).tolist()
+    return [index for index, (distance, limit) in enumerate(zip(distances, limits)) if distance <= limit]
@@ -0,0 +1,121 @@
+from math import cos, floor, radians, sqrt
+from threading import Lock
+from time import monotonic
+from distance import PointSet, any_within, indexes_within
+
+METERS_PER_DEGREE = 111320.0
+# Grid cell edge in degrees (~5.5 km north-south); fences are bucketed into every cell their bounding box touches
+CELL_SIZE_DEGREES = 0.05
+# Haversine on a sphere differs from the WGS-84 geodesic by well under 0.5%, so only
+# points inside this band around a fence edge need the exact (and slow) geodesic check
+BOUNDARY_TOLERANCE = 0.005
+
+
+def _cell(lat, lon):
+    return floor(lat / CELL_SIZE_DEGREES), floor(lon / CELL_SIZE_DEGREES)
+
+
+class _Fence:
+    __slots__ = ('latitude', 'longitude', 'radius', 'min_lat', 'max_lat', 'min_lon', 'max_lon')
+
+    def __init__(self, latitude, longitude, radius):
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.radius = float(radius)
+        margin = self.radius * (1 + BOUNDARY_TOLERANCE)
+        lat_delta = margin / METERS_PER_DEGREE
+        lon_delta = margin / (METERS_PER_DEGREE * max(cos(radians(self.latitude)), 0.01))
+        self.min_lat = self.latitude - lat_delta
+        self.max_lat = self.latitude + lat_delta
+        self.min_lon = self.longitude - lon_delta
+        self.max_lon = self.longitude + lon_delta
+
+
+def inscribed_box(latitude, longitude, radius):
+    """(min_lat, max_lat, min_lon, max_lon) of a square that lies entirely inside the fence.
+
+    Points in the box are certainly inside, so SQL can discard them before the exact check.
+    """
+    half_side = radius * (1 - BOUNDARY_TOLERANCE) / sqrt(2)
+    lat_delta = half_side / METERS_PER_DEGREE
+    lon_delta = half_side / (METERS_PER_DEGREE * max(cos(radians(abs(latitude) + lat_delta)), 0.01))
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+
+
+class _Cell:
+    __slots__ = ('fences', 'centres', 'inner', 'outer')
+
+    def __init__(self, fences):
+        self.fences = fences
+        self.centres = PointSet([(fence.latitude, fence.longitude) for fence in fences])
+        self.inner = self.centres.as_array([fence.radius * (1 - BOUNDARY_TOLERANCE) for fence in fences])
+        self.outer = self.centres.as_array([fence.radius * (1 + BOUNDARY_TOLERANCE) for fence in fences])
+
+
+class GeofenceIndex:
+    """Grid-bucketed set of circular fences belonging to one admin.
+
+    Each grid cell keeps its fence centres as a PointSet, so a lookup measures the
+    distance to every candidate fence in one vectorized pass.
+    """
+
+    def __init__(self, fences):
+        buckets = {}
+        for latitude, longitude, radius in fences:
+            fence = _Fence(latitude, longitude, radius)
+            min_row, min_col = _cell(fence.min_lat, fence.min_lon)
+            max_row, max_col = _cell(fence.max_lat, fence.max_lon)
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    buckets.setdefault((row, col), []).append(fence)
+        self._cells = {key: _Cell(bucket) for key, bucket in buckets.items()}
+
+    def contains(self, location):
+        cell = self._cells.get(_cell(*location))
+        if cell is None:
+            return False
+        distances = cell.centres.distances_from(location)
+        if any_within(distances, cell.inner):
+            return True
+        for index in indexes_within(distances, cell.outer):
+            fence = cell.fences[index]
+            from geopy.distance import geodesic  # deferred: geopy pulls in requests and every geocoder at import
+            if geodesic(location, (fence.latitude, fence.longitude)).meters <= fence.radius:
+                return True
+        return False
+
+
+class GeofenceMatcher:
+    """Per-admin GeofenceIndex cache.
+
+    `load_fences(admin_id)` must return (latitude, longitude, radius) tuples. Call
+    `invalidate(admin_id)` whenever that admin's fences change; the TTL bounds how
+    long other worker processes keep serving an index built before the change.
+    """
+
+    def __init__(self, load_fences, ttl=60, app=None):
+        self._load_fences = load_fences
+        self._ttl = ttl
+        self._indexes = {}
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._ttl = app.config.get('GEOFENCE_INDEX_TTL', self._ttl)
+
+    def _index_for(self, admin_id):
+        entry = self._indexes.get(admin_id)
+        if entry is not None and monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        index = GeofenceIndex(self._load_fences(admin_id))
+        with self._lock:
+            self._indexes[admin_id] = (monotonic(), index)
+        return index
+
+    def is_inside(self, admin_id, location):
+        return self._index_for(admin_id).contains(location)
+
+    def invalidate(self, admin_id):
+        with self._lock:
+            self._indexes.pop(admin_id, None)
@@ -0,0 +1,68 @@
+# Gunicorn settings; the Procfile points gunicorn here. Every value can be overridden from the environment.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# gthread needs nothing beyond gunicorn itself; set GUNICORN_WORKER_CLASS=gevent when gevent is installed
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# gunicorn turns sync workers into gthread ones when threads > 1, so only gthread gets more than one
+threads = int(os.getenv('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+_cpus = multiprocessing.cpu_count()
+if worker_class == 'sync':
+    _default_workers = _cpus * 2 + 1
+elif worker_class == 'gthread':
+    _default_workers = _cpus + 1
+else:
+    _default_workers = _cpus
+# Same default as config.engine_options(). Each sync/gthread worker needs a connection per thread, so the
+# default worker count is capped to what the database allows; gevent greenlets queue on their pool instead.
+_db_max_connections = int(os.getenv('DB_MAX_CONNECTIONS', 20))
+if worker_class in ('sync', 'gthread'):
+    _default_workers = max(min(_default_workers, _db_max_connections // threads), 1)
+workers = int(os.getenv('WEB_CONCURRENCY', _default_workers))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
+
+# Phones on job-site networks reuse connections between the dashboard GET and the punch POST
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# config.engine_options() sizes each worker's connection pool from the worker and thread counts
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+if worker_class in ('sync', 'gthread'):
+    os.environ.setdefault('GUNICORN_THREADS', str(threads))
+
+
+def on_starting(server):
+    if worker_class in ('sync', 'gthread') and workers * threads > _db_max_connections:
+        server.log.warning('%d workers x %d threads exceed DB_MAX_CONNECTIONS=%d; requests will wait for pool connections',
+                           workers, threads, _db_max_connections)
+
+
+def _make_psycopg2_green():
+    # Let psycopg2 yield to the gevent hub while waiting on the socket instead of blocking the whole worker
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    def wait_callback(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == extensions.POLL_OK:
+                break
+            elif state == extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f'Bad result from poll: {state!r}')
+
+    extensions.set_wait_callback(wait_callback)
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        _make_psycopg2_green()
@@ -0,0 +1,81 @@
+import json
+import logging
+from time import perf_counter
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+
+class RequestTiming:
+    """Opt-in per-request SQL and template timing.
+
+    When REQUEST_TIMING is off nothing is registered at all, so disabled requests pay
+    no cost. When on, every response carries a Server-Timing header and one JSON log
+    line with the statement count, time spent in SQL, time spent rendering and total.
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        if not app.config.get('REQUEST_TIMING'):
+            return
+
+        self.logger = app.logger.getChild('timing')
+        self.logger.setLevel(logging.INFO)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        g.request_timing = {'start': perf_counter(), 'queries': 0, 'db': 0.0, 'render': 0.0}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('request_timing_start', []).append(perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        timing = g.get('request_timing') if has_request_context() else None
+        starts = conn.info.get('request_timing_start')
+        if timing is None or not starts:
+            return
+        timing['queries'] += 1
+        timing['db'] += perf_counter() - starts.pop()
+
+    def _before_render(self, sender, template, context, **extra):
+        if 'request_timing' in g:
+            g.request_timing['render_start'] = perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        timing = g.get('request_timing')
+        if timing is not None and 'render_start' in timing:
+            timing['render'] += perf_counter() - timing.pop('render_start')
+
+    def _finish_request(self, response):
+        timing = g.pop('request_timing', None)
+        if timing is None:
+            return response
+        total_ms = (perf_counter() - timing['start']) * 1000
+        db_ms = timing['db'] * 1000
+        render_ms = timing['render'] * 1000
+        response.headers['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{timing["queries"]} queries", '
+            f'render;dur={render_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        self.logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': timing['queries'],
+            'db_ms': round(db_ms, 2),
+            'render_ms': round(render_ms, 2),
+            'total_ms': round(total_ms, 2),
+        }))
+        return response
@@ -0,0 +1,115 @@
+"""Simulate a shift clocking in at once and report punch throughput.
+
+Seeds an admin, a geofence and N workers, logs every worker in, then releases all
+of them at the same moment to POST a clock-in (and afterwards a clock-out) to
+/worker_dashboard. Without --url the app is served in-process by a threaded
+Werkzeug server on a temporary SQLite database; with --url the requests go to a
+running gunicorn that must use the database given with --database-url.
+
+    python loadtest_clock_in.py --workers 200 --concurrency 50
+    python loadtest_clock_in.py --url http://127.0.0.1:5000 --database-url postgresql://localhost/loadtest
+"""
+import argparse
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--workers', type=int, default=100, help='number of workers punching in the burst')
+parser.add_argument('--concurrency', type=int, default=50, help='client threads sending requests')
+parser.add_argument('--url', default=None, help='base URL of a running server; defaults to an in-process server')
+parser.add_argument('--database-url', default=None, help='defaults to a temporary SQLite file; the database is dropped and recreated')
+args = parser.parse_args()
+
+os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+
+import requests  # noqa: E402
+from app import create_app, password_manager  # noqa: E402
+from models import db, User, Timestamp, Geofence  # noqa: E402
+
+app = create_app()
+
+SITE = (59.3293, 18.0686)
+PASSWORD = 'loadtest'
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    password = password_manager.hash(PASSWORD)
+    admin = User(first_name='Load', last_name='Admin', password=password, role='admin', admin_code='loadtest')
+    db.session.add(admin)
+    db.session.flush()
+    db.session.add(Geofence(latitude=SITE[0], longitude=SITE[1], radius=200, admin_id=admin.id))
+    db.session.execute(User.__table__.insert(), [
+        {'first_name': f'Worker{i}', 'last_name': 'Load', 'password': password, 'role': 'worker', 'admin_code': 'loadtest'}
+        for i in range(args.workers)
+    ])
+    db.session.commit()
+
+
+def start_server():
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def log_in(base_url, index):
+    session = requests.Session()
+    page = session.get(f'{base_url}/login')
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page.text).group(1)
+    session.post(f'{base_url}/login', data={'csrf_token': token, 'first_name': f'Worker{index}', 'last_name': 'Load', 'password': PASSWORD})
+    return session
+
+
+def burst(label, base_url, sessions, data):
+    barrier = threading.Barrier(min(args.concurrency, len(sessions)))
+
+    def punch(session):
+        try:
+            barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        response = session.post(f'{base_url}/worker_dashboard', data=data, allow_redirects=False)
+        return time.perf_counter() - start, response.status_code < 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(punch, sessions))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    percentiles = statistics.quantiles(latencies, n=100)
+    errors = sum(1 for _, ok in results if not ok)
+    print(f'{label}: {len(results)} requests in {elapsed:.2f}s = {len(results) / elapsed:.1f} req/s, '
+          f'p50 {percentiles[49]:.1f} ms, p95 {percentiles[94]:.1f} ms, p99 {percentiles[98]:.1f} ms, errors {errors}')
+
+
+with app.app_context():
+    seed()
+
+server = None
+base_url = args.url
+if base_url is None:
+    base_url, server = start_server()
+
+print(f'Logging in {args.workers} workers against {base_url}')
+with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+    sessions = list(pool.map(lambda index: log_in(base_url, index), range(args.workers)))
+
+burst('clock-in ', base_url, sessions, {'latitude': SITE[0], 'longitude': SITE[1]})
+burst('clock-out', base_url, sessions, {'latitude': SITE[0], 'longitude': SITE[1], 'break_duration': 0, 'lunch_duration': 0})
+
+with app.app_context():
+    closed = Timestamp.query.filter(Timestamp.clock_out.isnot(None)).count()
+    print(f'{closed} of {args.workers} punches recorded, {Timestamp.query.count() - closed} left open')
+
+if server is not None:
+    server.shutdown()
@@ -0,0 +1,99 @@
+"""Building blocks for Alembic revisions that must not lock large tables.
+
+Plain nullable ADD COLUMN is already metadata-only on Postgres and SQLite, so
+revisions use op.add_column directly. Index builds and data backfills are the
+slow parts and go through the helpers below.
+
+These helpers leave the revision's transaction (the index helpers on Postgres
+only), which also commits everything the revision did before them, ahead of
+Alembic stamping it. Schema changes
+therefore go in a revision of their own, followed by a revision that only
+backfills or builds indexes; a failed run of the latter can simply be rerun.
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.backfill')
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _index_is_valid(name):
+    """True or False for an existing index (False: a failed concurrent build left it INVALID), None if absent."""
+    return op.get_bind().execute(sa.text(
+        'SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)'
+    ), {'name': name}).scalar()
+
+
+def create_index_online(name, table, columns, unique=False, **kw):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, hence the autocommit block.
+    # Extra keyword arguments (e.g. postgresql_where/sqlite_where) go straight to op.create_index
+    if _is_postgres():
+        with op.get_context().autocommit_block():
+            valid = _index_is_valid(name)
+            if valid:
+                # Built by an earlier run of this revision that failed further on
+                logger.info('Index %s already exists', name)
+                return
+            if valid is False:
+                # An INVALID index is still maintained on writes but never used, and a unique
+                # one never enforced, so it is rebuilt rather than skipped with IF NOT EXISTS
+                logger.warning('Index %s is INVALID after an interrupted build; rebuilding it', name)
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, **kw)
+    elif name not in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}:
+        # A backfill earlier in the revision may have committed a previous run's indexes too;
+        # elsewhere an index build is atomic, so one that exists is complete
+        op.create_index(name, table, columns, unique=unique, **kw)
+
+
+def drop_index_online(name, table):
+    if _is_postgres():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def backfill_in_batches(table, where, values=None, compute=None, columns=(), batch_size=1000):
+    """Update the rows of `table` matching `where` in primary-key order, one committed batch at a time.
+
+    Either `values` (a dict of constants or SQL expressions applied to the whole batch)
+    or `compute` (called with each row selected with `columns`, returning that row's new
+    values) must be given. Each batch commits on its own, so row locks are held only
+    briefly. That also commits whatever the revision did before calling this, so the
+    revision must not change the schema itself (see the module docstring); then an
+    interrupted run is rerun from the revision and carries on where it stopped. `where`
+    must stop matching a row once it is backfilled, or reruns would redo finished batches.
+    """
+    connection = op.get_bind()
+    total = connection.execute(sa.select(sa.func.count()).select_from(table).where(where)).scalar()
+    logger.info('Backfilling %s: %d rows', table.name, total)
+    if not total:
+        return
+
+    done = 0
+    last_id = None
+    with op.get_context().autocommit_block():
+        while True:
+            query = sa.select(table.c.id, *columns).where(where).order_by(table.c.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+            rows = connection.execute(query).all()
+            if not rows:
+                break
+            # Autocommit mode: each batch's single UPDATE commits as soon as it finishes
+            if compute is not None:
+                connection.execute(
+                    table.update().where(table.c.id == sa.bindparam('_id')),
+                    [{'_id': row.id, **compute(row)} for row in rows],
+                )
+            else:
+                connection.execute(table.update().where(table.c.id.in_([row.id for row in rows])).values(values))
+            done += len(rows)
+            last_id = rows[-1].id
+            logger.info('Backfilling %s: %d/%d rows (%d%%)', table.name, done, total, done * 100 // total)
@@ -0,0 +1,28 @@
+"""Add punch location columns.
+
+Revision ID: 108632d7477d
+Revises: b27e4c0d9a13
+Create Date: 2026-10-18 13:39:45.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '108632d7477d'
+down_revision = 'b27e4c0d9a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable columns without a default: a catalog-only change, the table is not rewritten
+    for name in ('clock_in_latitude', 'clock_in_longitude', 'clock_out_latitude', 'clock_out_longitude'):
+        op.add_column('timestamp', sa.Column(name, sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('timestamp', schema=None) as batch_op:
+        for name in ('clock_out_longitude', 'clock_out_latitude', 'clock_in_longitude', 'clock_in_latitude'):
+            batch_op.drop_column(name)
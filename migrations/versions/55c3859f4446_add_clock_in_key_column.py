@@ -0,0 +1,25 @@
+"""Add the clock-in idempotency key column.
+
+Revision ID: 55c3859f4446
+Revises: d71f3c2a8e65
+Create Date: 2026-10-18 16:18:30.771946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '55c3859f4446'
+down_revision = 'd71f3c2a8e65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('timestamp', sa.Column('clock_in_key', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('timestamp', schema=None) as batch_op:
+        batch_op.drop_column('clock_in_key')
@@ -0,0 +1,27 @@
+"""Add composite indexes for keyset pagination of timestamps.
+
+Revision ID: 5c1e7a9d4b20
+Revises: 33b2f1a1550f
+Create Date: 2026-10-18 09:12:04.518233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9d4b20'
+down_revision = '33b2f1a1550f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online('ix_timestamp_user_id_clock_in', 'timestamp', ['user_id', 'clock_in', 'id'])
+    create_index_online('ix_timestamp_clock_in', 'timestamp', ['clock_in', 'id'])
+
+
+def downgrade():
+    drop_index_online('ix_timestamp_clock_in', 'timestamp')
+    drop_index_online('ix_timestamp_user_id_clock_in', 'timestamp')
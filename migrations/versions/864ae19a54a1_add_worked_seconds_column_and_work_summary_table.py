@@ -0,0 +1,40 @@
+"""Add the timestamp.worked_seconds column and the work_summary table.
+
+Revision ID: 864ae19a54a1
+Revises: 5c1e7a9d4b20
+Create Date: 2026-10-18 10:01:12.402517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '864ae19a54a1'
+down_revision = '5c1e7a9d4b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Schema only: 8f3d2b6a7c41 fills both, so this is committed and stamped before its
+    # autocommit backfill runs and an interrupted backfill can be rerun on its own
+    with op.batch_alter_table('timestamp', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('worked_seconds', sa.Integer(), nullable=True))
+
+    op.create_table('work_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('worked_seconds', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'period', 'period_start', name='uq_work_summary_user_period')
+    )
+
+
+def downgrade():
+    op.drop_table('work_summary')
+    with op.batch_alter_table('timestamp', schema=None) as batch_op:
+        batch_op.drop_column('worked_seconds')
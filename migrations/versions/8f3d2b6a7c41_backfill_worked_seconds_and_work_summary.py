@@ -0,0 +1,72 @@
+"""Backfill timestamp.worked_seconds and build the work_summary rollups.
+
+Revision ID: 8f3d2b6a7c41
+Revises: 864ae19a54a1
+Create Date: 2026-10-18 10:03:51.220174
+
+"""
+from collections import defaultdict
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import backfill_in_batches
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3d2b6a7c41'
+down_revision = '864ae19a54a1'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+work_summary = sa.table('work_summary',
+    sa.column('user_id', sa.Integer), sa.column('period', sa.String), sa.column('period_start', sa.Date),
+    sa.column('worked_seconds', sa.Integer))
+
+
+def upgrade():
+    timestamp = sa.table('timestamp',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('clock_in', sa.DateTime), sa.column('clock_out', sa.DateTime),
+        sa.column('break_duration', sa.Integer), sa.column('lunch_duration', sa.Integer),
+        sa.column('worked_seconds', sa.Integer))
+
+    def worked_seconds(row):
+        seconds = int((row.clock_out - row.clock_in).total_seconds()) - ((row.break_duration or 0) + (row.lunch_duration or 0)) * 60
+        return {'worked_seconds': max(seconds, 0)}
+
+    backfill_in_batches(
+        timestamp,
+        where=sa.and_(timestamp.c.clock_out.isnot(None), timestamp.c.worked_seconds.is_(None)),
+        compute=worked_seconds,
+        columns=(timestamp.c.clock_in, timestamp.c.clock_out, timestamp.c.break_duration, timestamp.c.lunch_duration),
+        batch_size=BATCH_SIZE,
+    )
+
+    # Rollups are built from the backfilled column in a separate read-only pass, so they come out
+    # right even when the backfill above was interrupted and resumed. They commit together with
+    # this revision's stamp, so a rerun never finds half of them in place.
+    totals = defaultdict(int)
+    # yield_per goes on the statement: Connection.execution_options() would change Alembic's shared
+    # connection in place and stream every later statement of the upgrade run
+    rows = op.get_bind().execute(
+        sa.select(timestamp.c.user_id, timestamp.c.clock_in, timestamp.c.worked_seconds)
+        .where(timestamp.c.worked_seconds.isnot(None))
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for row in rows:
+        day = row.clock_in.date()
+        totals[(row.user_id, 'day', day)] += row.worked_seconds
+        totals[(row.user_id, 'week', day - timedelta(days=day.weekday()))] += row.worked_seconds
+
+    if totals:
+        op.bulk_insert(work_summary, [
+            {'user_id': user_id, 'period': period, 'period_start': period_start, 'worked_seconds': seconds}
+            for (user_id, period, period_start), seconds in totals.items()
+        ])
+
+
+def downgrade():
+    # The backfilled worked_seconds stay; the rollups go, since upgrading again rebuilds them
+    op.execute(work_summary.delete())
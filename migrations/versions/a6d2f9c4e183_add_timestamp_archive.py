@@ -0,0 +1,58 @@
+"""Add timestamp_archive, monthly range partitioned on Postgres.
+
+Revision ID: a6d2f9c4e183
+Revises: f3c8d6b1a2e7
+Create Date: 2026-10-18 18:12:37.508113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f9c4e183'
+down_revision = 'f3c8d6b1a2e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A new, empty table, so plain index builds are fine; the partitions themselves are
+    # created by `flask archive-timestamps` and inherit these indexes
+    op.create_table('timestamp_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('clock_in', sa.DateTime(), nullable=False),
+    sa.Column('clock_out', sa.DateTime(), nullable=True),
+    sa.Column('break_duration', sa.Integer(), nullable=True),
+    sa.Column('lunch_duration', sa.Integer(), nullable=True),
+    sa.Column('worked_seconds', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('edited', sa.Boolean(), nullable=True),
+    sa.Column('clock_in_edited', sa.Boolean(), nullable=True),
+    sa.Column('clock_out_edited', sa.Boolean(), nullable=True),
+    sa.Column('break_duration_edited', sa.Boolean(), nullable=True),
+    sa.Column('lunch_duration_edited', sa.Boolean(), nullable=True),
+    sa.Column('clock_in_latitude', sa.Float(), nullable=True),
+    sa.Column('clock_in_longitude', sa.Float(), nullable=True),
+    sa.Column('clock_out_latitude', sa.Float(), nullable=True),
+    sa.Column('clock_out_longitude', sa.Float(), nullable=True),
+    sa.Column('clock_in_key', sa.String(length=32), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id', 'clock_in'),
+    postgresql_partition_by='RANGE (clock_in)',
+    )
+    op.create_index('ix_timestamp_archive_user_id_clock_in', 'timestamp_archive', ['user_id', 'clock_in', 'id'])
+    op.create_index('ix_timestamp_archive_clock_in', 'timestamp_archive', ['clock_in', 'id'])
+
+
+def downgrade():
+    # Archived rows go back to timestamp before the archive (and every partition with it) is dropped
+    columns = ', '.join([
+        'id', 'clock_in', 'clock_out', 'break_duration', 'lunch_duration', 'worked_seconds', 'user_id',
+        'edited', 'clock_in_edited', 'clock_out_edited', 'break_duration_edited', 'lunch_duration_edited',
+        'clock_in_latitude', 'clock_in_longitude', 'clock_out_latitude', 'clock_out_longitude', 'clock_in_key',
+    ])
+    op.execute(f'INSERT INTO timestamp ({columns}) SELECT {columns} FROM timestamp_archive')
+    op.drop_index('ix_timestamp_archive_clock_in', table_name='timestamp_archive')
+    op.drop_index('ix_timestamp_archive_user_id_clock_in', table_name='timestamp_archive')
+    op.drop_table('timestamp_archive')
@@ -0,0 +1,28 @@
+"""Add indexes for login and admin_code lookups on user.
+
+Revision ID: b27e4c0d9a13
+Revises: 8f3d2b6a7c41
+Create Date: 2026-10-18 11:27:40.913552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27e4c0d9a13'
+down_revision = '8f3d2b6a7c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if two users already share a first/last name; merge or rename those rows first
+    create_index_online('uq_user_first_name_last_name', 'user', ['first_name', 'last_name'], unique=True)
+    create_index_online('ix_user_admin_code_role', 'user', ['admin_code', 'role'])
+
+
+def downgrade():
+    drop_index_online('ix_user_admin_code_role', 'user')
+    drop_index_online('uq_user_first_name_last_name', 'user')
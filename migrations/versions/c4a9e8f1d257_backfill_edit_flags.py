@@ -0,0 +1,34 @@
+"""Backfill NULL edit flags.
+
+Revision ID: c4a9e8f1d257
+Revises: 108632d7477d
+Create Date: 2026-10-18 13:41:09.377120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import backfill_in_batches
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e8f1d257'
+down_revision = '108632d7477d'
+branch_labels = None
+depends_on = None
+
+EDIT_FLAGS = ('edited', 'clock_in_edited', 'clock_out_edited', 'break_duration_edited', 'lunch_duration_edited')
+
+
+def upgrade():
+    # Rows from before the flags existed (the old update_db.py ALTERs) may still hold NULL
+    timestamp = sa.table('timestamp', sa.column('id', sa.Integer), *(sa.column(flag, sa.Boolean) for flag in EDIT_FLAGS))
+    backfill_in_batches(
+        timestamp,
+        where=sa.or_(*(timestamp.c[flag].is_(None) for flag in EDIT_FLAGS)),
+        values={flag: sa.func.coalesce(timestamp.c[flag], sa.false()) for flag in EDIT_FLAGS},
+    )
+
+
+def downgrade():
+    # Which flags were NULL is not recorded, and False means the same thing to the app
+    pass
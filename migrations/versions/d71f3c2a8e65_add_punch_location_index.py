@@ -0,0 +1,27 @@
+"""Add a per-worker, per-day index covering punch coordinates.
+
+Revision ID: d71f3c2a8e65
+Revises: c4a9e8f1d257
+Create Date: 2026-10-18 15:02:37.518244
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = 'd71f3c2a8e65'
+down_revision = 'c4a9e8f1d257'
+branch_labels = None
+depends_on = None
+
+LOCATION_COLUMNS = ['user_id', 'clock_in', 'clock_in_latitude', 'clock_in_longitude', 'clock_out_latitude', 'clock_out_longitude']
+
+
+def upgrade():
+    create_index_online('ix_timestamp_user_id_clock_in_location', 'timestamp', LOCATION_COLUMNS)
+
+
+def downgrade():
+    drop_index_online('ix_timestamp_user_id_clock_in_location', 'timestamp')
@@ -0,0 +1,45 @@
+"""Close duplicate open punches, then allow only one per user and make clock-in keys unique.
+
+Revision ID: e5b0a7c3f914
+Revises: 55c3859f4446
+Create Date: 2026-10-18 16:20:54.104872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import backfill_in_batches, create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b0a7c3f914'
+down_revision = '55c3859f4446'
+branch_labels = None
+depends_on = None
+
+OPEN_PUNCH = sa.text('clock_out IS NULL')
+
+
+def upgrade():
+    # Double-taps left some workers with several open punches. Keep the newest one open and close
+    # the others as zero-length, flagged as edited so admins can see and correct them.
+    timestamp = sa.table(
+        'timestamp', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('clock_in', sa.DateTime),
+        sa.column('clock_out', sa.DateTime), sa.column('worked_seconds', sa.Integer),
+        sa.column('edited', sa.Boolean), sa.column('clock_out_edited', sa.Boolean),
+    )
+    newer = timestamp.alias('newer')
+    backfill_in_batches(
+        timestamp,
+        where=sa.and_(timestamp.c.clock_out.is_(None), sa.exists().where(
+            newer.c.user_id == timestamp.c.user_id, newer.c.clock_out.is_(None), newer.c.id > timestamp.c.id,
+        )),
+        values={'clock_out': timestamp.c.clock_in, 'worked_seconds': 0, 'edited': sa.true(), 'clock_out_edited': sa.true()},
+    )
+
+    create_index_online('uq_timestamp_open_punch', 'timestamp', ['user_id'], unique=True, postgresql_where=OPEN_PUNCH, sqlite_where=OPEN_PUNCH)
+    create_index_online('uq_timestamp_user_id_clock_in_key', 'timestamp', ['user_id', 'clock_in_key'], unique=True)
+
+
+def downgrade():
+    drop_index_online('uq_timestamp_user_id_clock_in_key', 'timestamp')
+    drop_index_online('uq_timestamp_open_punch', 'timestamp')
@@ -0,0 +1,25 @@
+"""Add a per-user date range index on vacation.
+
+Revision ID: f3c8d6b1a2e7
+Revises: e5b0a7c3f914
+Create Date: 2026-10-18 17:05:12.640391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migration_helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8d6b1a2e7'
+down_revision = 'e5b0a7c3f914'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online('ix_vacation_user_id_end_date_start_date', 'vacation', ['user_id', 'end_date', 'start_date'])
+
+
+def downgrade():
+    drop_index_online('ix_vacation_user_id_end_date_start_date', 'vacation')
@@ -1,28 +1,66 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import UserMixin, LoginManager
-from datetime import datetime, timedelta
+from flask_login import UserMixin
+from datetime import datetime
 
 db = SQLAlchemy()
-login_manager = LoginManager()
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(20), nullable=False)
     last_name = db.Column(db.String(20), nullable=False)
     password = db.Column(db.String(60), nullable=False)
-    role = db.Column(db.String(20), nullable=False, default='worker')
+    role = db.Column(db.String(10), nullable=False)
     admin_code = db.Column(db.String(255), nullable=True)
+    
+    timestamps = db.relationship('Timestamp', backref='user', lazy=True)
 
     def __repr__(self):
         return f"User('{self.first_name}', '{self.last_name}', '{self.role}')"
 
+    __table_args__ = (
+        db.Index('uq_user_first_name_last_name', 'first_name', 'last_name', unique=True),
+        db.Index('ix_user_admin_code_role', 'admin_code', 'role'),
+    )
+
 class Timestamp(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     clock_in = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     clock_out = db.Column(db.DateTime, nullable=True)
     break_duration = db.Column(db.Integer, nullable=True)
     lunch_duration = db.Column(db.Integer, nullable=True)
-    worked_hours = db.Column(db.Float, nullable=True)
+    worked_seconds = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    edited = db.Column(db.Boolean, default=False)
+    clock_in_edited = db.Column(db.Boolean, default=False)
+    clock_out_edited = db.Column(db.Boolean, default=False)
+    break_duration_edited = db.Column(db.Boolean, default=False)
+    lunch_duration_edited = db.Column(db.Boolean, default=False)
+    clock_in_latitude = db.Column(db.Float, nullable=True)
+    clock_in_longitude = db.Column(db.Float, nullable=True)
+    clock_out_latitude = db.Column(db.Float, nullable=True)
+    clock_out_longitude = db.Column(db.Float, nullable=True)
+    # Idempotency key from the clock-in form; a resubmitted form inserts nothing
+    clock_in_key = db.Column(db.String(32), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_timestamp_user_id_clock_in', 'user_id', 'clock_in', 'id'),
+        db.Index('ix_timestamp_clock_in', 'clock_in', 'id'),
+        db.Index('uq_timestamp_user_id_clock_in_key', 'user_id', 'clock_in_key', unique=True),
+        # At most one open punch per worker, so concurrent clock-ins cannot both succeed
+        db.Index('uq_timestamp_open_punch', 'user_id', unique=True, postgresql_where=db.text('clock_out IS NULL'), sqlite_where=db.text('clock_out IS NULL')),
+        # Per worker and day, with the coordinates in the index so bounding-box filters never touch the table
+        db.Index('ix_timestamp_user_id_clock_in_location', 'user_id', 'clock_in', 'clock_in_latitude', 'clock_in_longitude', 'clock_out_latitude', 'clock_out_longitude'),
+    )
+
+class TimestampArchive(db.Model):
+    # Closed months moved out of timestamp by `flask archive-timestamps`; same columns, ids kept.
+    # On Postgres the table is range partitioned by month of clock_in, so the key must include it.
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    clock_in = db.Column(db.DateTime, primary_key=True)
+    clock_out = db.Column(db.DateTime, nullable=True)
+    break_duration = db.Column(db.Integer, nullable=True)
+    lunch_duration = db.Column(db.Integer, nullable=True)
+    worked_seconds = db.Column(db.Integer, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     edited = db.Column(db.Boolean, default=False)
     clock_in_edited = db.Column(db.Boolean, default=False)
@@ -33,6 +71,24 @@ class Timestamp(db.Model):
     clock_in_longitude = db.Column(db.Float, nullable=True)
     clock_out_latitude = db.Column(db.Float, nullable=True)
     clock_out_longitude = db.Column(db.Float, nullable=True)
+    clock_in_key = db.Column(db.String(32), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_timestamp_archive_user_id_clock_in', 'user_id', 'clock_in', 'id'),
+        db.Index('ix_timestamp_archive_clock_in', 'clock_in', 'id'),
+        {'postgresql_partition_by': 'RANGE (clock_in)'},
+    )
+
+class WorkSummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # 'day' or 'week' (ISO week, keyed by its Monday)
+    period_start = db.Column(db.Date, nullable=False)
+    worked_seconds = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'period_start', name='uq_work_summary_user_period'),
+    )
 
 class Vacation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -41,9 +97,14 @@ class Vacation(db.Model):
     status = db.Column(db.String(20), nullable=False, default='pending')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        # end_date leads the range: nearly all history starts before any given day, but little of it ends after it
+        db.Index('ix_vacation_user_id_end_date_start_date', 'user_id', 'end_date', 'start_date'),
+    )
+
 class Geofence(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
-    radius = db.Column(db.Integer, nullable=False)
+    radius = db.Column(db.Float, nullable=False)
     admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
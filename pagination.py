@@ -0,0 +1,73 @@
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    def __init__(self, items, older_cursor=None, newer_cursor=None):
+        self.items = items
+        self.older_cursor = older_cursor
+        self.newer_cursor = newer_cursor
+
+    @property
+    def has_older(self):
+        return self.older_cursor is not None
+
+    @property
+    def has_newer(self):
+        return self.newer_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(sort_value, row_id):
+    return f'{sort_value.isoformat()}_{row_id}'
+
+
+def decode_cursor(cursor):
+    # Malformed cursors (hand-edited URLs etc.) simply fall back to the first page
+    if not cursor:
+        return None
+    try:
+        sort_value, row_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except ValueError:
+        return None
+
+
+def paginate_keyset(query, sort_column, id_column, before=None, after=None, per_page=50):
+    """Return one page of `query` ordered newest first on (sort_column, id_column).
+
+    `before` fetches the rows older than the given cursor and `after` the rows
+    newer than it. Each page is a single indexed range scan of per_page + 1 rows,
+    so the cost does not depend on how deep into the history the page is.
+    """
+    sort_attr = sort_column.key
+    id_attr = id_column.key
+    key = tuple_(sort_column, id_column)
+
+    after_key = decode_cursor(after)
+    if after_key is not None:
+        rows = query.filter(key > after_key).order_by(sort_column.asc(), id_column.asc()).limit(per_page + 1).all()
+        has_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        if not items:
+            return KeysetPage([], older_cursor=after)
+        newer_cursor = encode_cursor(getattr(items[0], sort_attr), getattr(items[0], id_attr)) if has_newer else None
+        older_cursor = encode_cursor(getattr(items[-1], sort_attr), getattr(items[-1], id_attr))
+        return KeysetPage(items, older_cursor=older_cursor, newer_cursor=newer_cursor)
+
+    before_key = decode_cursor(before)
+    if before_key is not None:
+        query = query.filter(key < before_key)
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    has_older = len(rows) > per_page
+    items = rows[:per_page]
+    if not items:
+        return KeysetPage([], newer_cursor=before if before_key is not None else None)
+    older_cursor = encode_cursor(getattr(items[-1], sort_attr), getattr(items[-1], id_attr)) if has_older else None
+    newer_cursor = encode_cursor(getattr(items[0], sort_attr), getattr(items[0], id_attr)) if before_key is not None else None
+    return KeysetPage(items, older_cursor=older_cursor, newer_cursor=newer_cursor)
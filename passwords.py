@@ -0,0 +1,99 @@
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic
+from flask_bcrypt import Bcrypt
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+
+class PasswordManager:
+    """bcrypt hashing run on a small, bounded pool of OS threads.
+
+    bcrypt releases the GIL while it works, so the rest of the process keeps serving
+    requests during a ~250ms verification. Under gevent workers `threading` is
+    monkey-patched and a ThreadPoolExecutor would only run greenlets, blocking the hub
+    for the whole hash, so a gevent ThreadPool of native threads is used instead; either
+    way BCRYPT_MAX_THREADS hashes run at once. Recent
+    successful verifications are remembered for LOGIN_CACHE_TTL seconds so repeated
+    logins from the same worker during a shift change skip the hash entirely.
+    """
+
+    def __init__(self, app=None):
+        self.bcrypt = Bcrypt()
+        self._executor = None
+        self._gevent_pool = None
+        self._cache = {}
+        self._cache_lock = Lock()
+        # Per-process key so cache entries are useless outside this process
+        self._cache_key = os.urandom(32)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.bcrypt.init_app(app)
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self._cache_ttl = app.config.get('LOGIN_CACHE_TTL', 300)
+        self._cache_size = app.config.get('LOGIN_CACHE_SIZE', 1024)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._gevent_pool is not None:
+            self._gevent_pool.kill()
+            self._gevent_pool = None
+        max_threads = app.config.get('BCRYPT_MAX_THREADS', 4)
+        if _gevent_patched():
+            from gevent.threadpool import ThreadPool
+            # A pool of our own rather than the hub's, whose size gevent picks and DNS lookups share
+            self._gevent_pool = ThreadPool(max_threads)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='bcrypt')
+
+    def _run(self, function, *args):
+        if self._gevent_pool is not None:
+            # Runs on a real thread; only the calling greenlet waits for it
+            return self._gevent_pool.apply(function, args)
+        return self._executor.submit(function, *args).result()
+
+    def hash(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def verify(self, stored, password):
+        if not stored.startswith(BCRYPT_PREFIXES):
+            # Legacy plaintext row; the caller rehashes it on successful login
+            return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+
+        cache_key = hmac.new(self._cache_key, f'{stored}\0{password}'.encode('utf-8'), hashlib.sha256).digest()
+        expires = self._cache.get(cache_key)
+        if expires is not None and expires > monotonic():
+            return True
+
+        if not self._run(self.bcrypt.check_password_hash, stored, password):
+            return False
+
+        with self._cache_lock:
+            if len(self._cache) >= self._cache_size:
+                now = monotonic()
+                self._cache = {key: value for key, value in self._cache.items() if value > now}
+                if len(self._cache) >= self._cache_size:
+                    self._cache.clear()
+            self._cache[cache_key] = monotonic() + self._cache_ttl
+        return True
+
+    def needs_rehash(self, stored):
+        if not stored.startswith(BCRYPT_PREFIXES):
+            return True
+        try:
+            return int(stored.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
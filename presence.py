@@ -0,0 +1,111 @@
+from queue import Empty, Full, Queue
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+
+class PresenceIndex:
+    """Who is clocked in right now, per admin code, with change notifications.
+
+    The index is built from the open punches on first use and then kept current by
+    clock_in()/clock_out() calls from the punch code. Each process only sees its own
+    punches, so every PRESENCE_RESYNC_INTERVAL seconds it reloads from the database
+    and publishes the differences; that interval bounds how late a punch handled by
+    another gunicorn worker, or an admin edit, shows up on a live board.
+
+    `load_open_punches()` must return dicts with admin_code, user_id, name,
+    timestamp_id and clock_in.
+
+    At most `max_streams` subscribers are served at once through open_stream()/
+    close_stream(); boards beyond that poll present() instead.
+    """
+
+    def __init__(self, load_open_punches=None, resync_interval=30, max_streams=100, app=None):
+        self._load = load_open_punches
+        self.resync_interval = resync_interval
+        self._streams = BoundedSemaphore(max_streams)
+        self._present = None
+        self._loaded_at = 0.0
+        self._lock = Lock()
+        self._subscribers = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.resync_interval = app.config.get('PRESENCE_RESYNC_INTERVAL', self.resync_interval)
+        if 'PRESENCE_MAX_STREAMS' in app.config:
+            self._streams = BoundedSemaphore(app.config['PRESENCE_MAX_STREAMS'])
+
+    def present(self, admin_code):
+        self.resync_if_due()
+        with self._lock:
+            return sorted(self._present.get(admin_code, {}).values(), key=lambda entry: entry['clock_in'])
+
+    def clock_in(self, admin_code, entry):
+        with self._lock:
+            if self._present is not None:
+                self._present.setdefault(admin_code, {})[entry['user_id']] = entry
+        self._publish(admin_code, {'type': 'clock_in', **entry})
+
+    def clock_out(self, admin_code, user_id):
+        with self._lock:
+            if self._present is not None:
+                self._present.get(admin_code, {}).pop(user_id, None)
+        self._publish(admin_code, {'type': 'clock_out', 'user_id': user_id})
+
+    def refresh(self):
+        """Reload on the next access, e.g. after an admin edit that may have opened or closed punches."""
+        self._loaded_at = 0.0
+
+    def resync_if_due(self):
+        if self._present is not None and monotonic() - self._loaded_at < self.resync_interval:
+            return
+        fresh = {}
+        for entry in self._load():
+            entry = dict(entry)
+            fresh.setdefault(entry.pop('admin_code'), {})[entry['user_id']] = entry
+        with self._lock:
+            previous, self._present, self._loaded_at = self._present, fresh, monotonic()
+        if previous is None:
+            return
+        for admin_code in set(previous) | set(fresh):
+            before, after = previous.get(admin_code, {}), fresh.get(admin_code, {})
+            for user_id in before.keys() - after.keys():
+                self._publish(admin_code, {'type': 'clock_out', 'user_id': user_id})
+            for user_id, entry in after.items():
+                if before.get(user_id) != entry:
+                    self._publish(admin_code, {'type': 'clock_in', **entry})
+
+    def open_stream(self):
+        """Take a stream slot without waiting; False when this process already serves its maximum."""
+        return self._streams.acquire(blocking=False)
+
+    def close_stream(self):
+        self._streams.release()
+
+    def subscribe(self, admin_code):
+        events = Queue(maxsize=1000)
+        with self._lock:
+            self._subscribers.setdefault(admin_code, set()).add(events)
+        return events
+
+    def unsubscribe(self, admin_code, events):
+        with self._lock:
+            self._subscribers.get(admin_code, set()).discard(events)
+
+    def next_event(self, events, timeout):
+        """The next event for a subscriber, or None after `timeout` seconds without one."""
+        try:
+            return events.get(timeout=timeout)
+        except Empty:
+            self.resync_if_due()
+            return None
+
+    def _publish(self, admin_code, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(admin_code, ()))
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except Full:
+                # A client this far behind is gone or stuck; it gets a fresh snapshot when it reconnects
+                pass
@@ -0,0 +1,110 @@
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, case, func, not_, or_
+from geofencing import GeofenceIndex, inscribed_box
+
+PERIODS = ('day', 'week', 'month')
+
+PeriodTotal = namedtuple('PeriodTotal', ['user_id', 'period_start', 'worked_seconds', 'punches'])
+OutsidePunch = namedtuple('OutsidePunch', ['timestamp_id', 'user_id', 'clock_in', 'punch', 'latitude', 'longitude'])
+
+
+def period_bucket(column, period, dialect_name):
+    """SQL expression truncating a DateTime column to the start date of its day, ISO week or month."""
+    if period not in PERIODS:
+        raise ValueError(f'Unknown period {period!r}')
+    if dialect_name == 'postgresql':
+        return func.date(func.date_trunc(period, column))
+    # SQLite date modifiers; '-6 days' then 'weekday 1' lands on the Monday on or before the date
+    if period == 'day':
+        return func.date(column)
+    if period == 'week':
+        return func.date(column, '-6 days', 'weekday 1')
+    return func.date(column, 'start of month')
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def worked_time_by_period(session, timestamp_model, period, user_ids=None, start=None, end=None, limit=None):
+    """Worked seconds and punch count per user and period, aggregated in the database.
+
+    Sums Timestamp.worked_seconds, which is already net of break and lunch, so open
+    punches are left out. Rows come back newest period first.
+    """
+    bucket = period_bucket(timestamp_model.clock_in, period, session.get_bind().dialect.name).label('period_start')
+    query = session.query(
+        timestamp_model.user_id,
+        bucket,
+        func.sum(timestamp_model.worked_seconds).label('worked_seconds'),
+        func.count(timestamp_model.id).label('punches'),
+    ).filter(timestamp_model.worked_seconds.isnot(None))
+    if user_ids is not None:
+        query = query.filter(timestamp_model.user_id.in_(user_ids))
+    if start is not None:
+        query = query.filter(timestamp_model.clock_in >= start)
+    if end is not None:
+        query = query.filter(timestamp_model.clock_in < end)
+    query = query.group_by(timestamp_model.user_id, bucket).order_by(bucket.desc(), timestamp_model.user_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [PeriodTotal(row.user_id, _as_date(row.period_start), row.worked_seconds, row.punches) for row in query]
+
+
+def current_totals_by_user(session, timestamp_model, user_ids, today=None):
+    """Map user_id to (this week's, this month's) worked seconds using a single grouped query."""
+    today = today or datetime.utcnow().date()
+    week_start = datetime.combine(today - timedelta(days=today.weekday()), time.min)
+    month_start = datetime.combine(today.replace(day=1), time.min)
+    worked = timestamp_model.worked_seconds
+    rows = session.query(
+        timestamp_model.user_id,
+        func.sum(case((timestamp_model.clock_in >= week_start, worked), else_=0)).label('week'),
+        func.sum(case((timestamp_model.clock_in >= month_start, worked), else_=0)).label('month'),
+    ).filter(
+        timestamp_model.user_id.in_(user_ids),
+        timestamp_model.clock_in >= min(week_start, month_start),
+        worked.isnot(None),
+    ).group_by(timestamp_model.user_id)
+    return {row.user_id: (row.week or 0, row.month or 0) for row in rows}
+
+
+def punches_outside_geofences(session, timestamp_model, fences, user_ids, start, end):
+    """Clock-ins and clock-outs between start and end whose recorded position is outside every fence.
+
+    `fences` are (latitude, longitude, radius) tuples. The database skips every punch that
+    falls in a square inscribed in some fence, which is most of them; only the rest come
+    back and get the exact circle test. Punches without coordinates are left out.
+    """
+    index = GeofenceIndex(fences)
+    boxes = [inscribed_box(*fence) for fence in fences]
+    sides = (
+        ('in', timestamp_model.clock_in_latitude, timestamp_model.clock_in_longitude),
+        ('out', timestamp_model.clock_out_latitude, timestamp_model.clock_out_longitude),
+    )
+
+    def not_certainly_inside(lat, lon):
+        inside_any = [and_(lat.between(min_lat, max_lat), lon.between(min_lon, max_lon)) for min_lat, max_lat, min_lon, max_lon in boxes]
+        return and_(lat.isnot(None), lon.isnot(None), not_(or_(*inside_any)) if inside_any else True)
+
+    rows = session.query(
+        timestamp_model.id, timestamp_model.user_id, timestamp_model.clock_in, *(column for _, lat, lon in sides for column in (lat, lon)),
+    ).filter(
+        timestamp_model.user_id.in_(user_ids),
+        timestamp_model.clock_in >= start,
+        timestamp_model.clock_in < end,
+        or_(*(not_certainly_inside(lat, lon) for _, lat, lon in sides)),
+    ).order_by(timestamp_model.clock_in, timestamp_model.id)
+
+    outside = []
+    for row in rows:
+        for punch, lat, lon in sides:
+            location = (getattr(row, lat.key), getattr(row, lon.key))
+            if location[0] is not None and location[1] is not None and not index.contains(location):
+                outside.append(OutsidePunch(row.id, row.user_id, row.clock_in, punch, *location))
+    return outside
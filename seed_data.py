@@ -0,0 +1,200 @@
+"""Fill a database with realistic synthetic data for benchmarks and local testing.
+
+Creates a master, admins with geofences around their site, and workers with
+vacations and weekday punch histories reaching back as far as needed for
+--timestamps punches in total, plus the work_summary rollups the dashboards
+read. Rows are written with COPY on Postgres and chunked executemany elsewhere,
+never through per-row ORM adds. Every user's password is --password.
+
+    python seed_data.py --timestamps 100000
+    python seed_data.py --timestamps 1000000 --database-url postgresql://localhost/timeguardian --reset
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from math import cos, radians
+from sqlalchemy import select
+from app import calculate_worked_seconds, create_app, password_manager, work_summary_periods
+from models import db, User, Timestamp, WorkSummary, Vacation, Geofence
+
+# About three years of working days per worker
+PUNCHES_PER_WORKER = 750
+WORKERS_PER_ADMIN = 40
+BATCH_SIZE = 10000
+PASSWORD = 'seed'
+
+SITES = [(59.3293, 18.0686), (57.7089, 11.9746), (55.6050, 13.0038), (59.8586, 17.6389), (58.4108, 15.6214)]
+FIRST_NAMES = ['Anna', 'Erik', 'Maria', 'Lars', 'Karin', 'Johan', 'Sara', 'Anders', 'Emma', 'Per', 'Elin', 'Nils', 'Ida', 'Olof', 'Linnea', 'Ali']
+LAST_NAMES = ['Andersson', 'Johansson', 'Karlsson', 'Nilsson', 'Eriksson', 'Larsson', 'Olsson', 'Persson', 'Svensson', 'Gustafsson']
+
+
+def bulk_insert(session, table, rows):
+    """Insert a list of dicts into `table`: COPY with psycopg2 on Postgres, chunked executemany otherwise."""
+    if not rows:
+        return
+    if session.get_bind().dialect.name == 'postgresql':
+        cursor = session.connection().connection.cursor()
+        if hasattr(cursor, 'copy_expert'):
+            preparer = session.get_bind().dialect.identifier_preparer
+            columns = list(rows[0])
+            buffer = io.StringIO()
+            # An unquoted empty field is NULL in COPY's csv format
+            csv.writer(buffer).writerows(['' if row[column] is None else row[column] for column in columns] for row in rows)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY {preparer.format_table(table)} ({", ".join(map(preparer.quote, columns))}) FROM STDIN WITH (FORMAT csv)', buffer)
+            return
+    for start in range(0, len(rows), BATCH_SIZE):
+        session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def near(rng, centre, meters):
+    """A random point within `meters` (per axis) of `centre`."""
+    lat = centre[0] + rng.uniform(-meters, meters) / 111320
+    lon = centre[1] + rng.uniform(-meters, meters) / (111320 * cos(radians(centre[0])))
+    return lat, lon
+
+
+def worker_vacations(rng, user_id, today, span_days):
+    vacations = []
+    # Two or three a year over the history, plus requests for the coming months
+    for _ in range(max(1, span_days * 5 // (2 * 365))):
+        start = today - timedelta(days=rng.randrange(span_days))
+        vacations.append({'user_id': user_id, 'start_date': start, 'end_date': start + timedelta(days=rng.randint(2, 14)), 'status': rng.choice(('approved',) * 8 + ('declined',))})
+    if rng.random() < 0.4:
+        start = today + timedelta(days=rng.randint(7, 120))
+        vacations.append({'user_id': user_id, 'start_date': start, 'end_date': start + timedelta(days=rng.randint(2, 21)), 'status': rng.choice(('pending', 'approved'))})
+    return vacations
+
+
+def worker_punches(rng, user_id, count, fence, today, days_off, now):
+    """`count` punches on working days going back from yesterday; one in ten workers is clocked in right now."""
+    punches = []
+
+    def punch(clock_in, clock_out, inside=True):
+        break_duration, lunch_duration = rng.choice((0, 10, 15, 20, 30)), rng.choice((30, 30, 45, 60))
+        clock_in_location = near(rng, fence[:2], fence[2] / 2 if inside else 3000)
+        clock_out_location = near(rng, fence[:2], fence[2] / 2) if clock_out else (None, None)
+        punches.append({
+            'user_id': user_id, 'clock_in': clock_in, 'clock_out': clock_out,
+            'break_duration': break_duration, 'lunch_duration': lunch_duration,
+            'worked_seconds': calculate_worked_seconds(clock_in, clock_out, break_duration, lunch_duration),
+            'edited': False, 'clock_in_edited': False, 'clock_out_edited': False, 'break_duration_edited': False, 'lunch_duration_edited': False,
+            'clock_in_latitude': clock_in_location[0], 'clock_in_longitude': clock_in_location[1],
+            'clock_out_latitude': clock_out_location[0], 'clock_out_longitude': clock_out_location[1],
+            'clock_in_key': None,
+        })
+
+    if count and rng.random() < 0.1:
+        punch(now - timedelta(minutes=rng.randint(15, 300)), None)
+    day = today
+    while len(punches) < count:
+        day -= timedelta(days=1)
+        if day.weekday() >= 5 or day in days_off or rng.random() < 0.05:
+            continue
+        clock_in = datetime(day.year, day.month, day.day, 6, 30) + timedelta(minutes=rng.randint(0, 150))
+        punch(clock_in, clock_in + timedelta(minutes=rng.randint(420, 600)), inside=rng.random() > 0.02)
+    return punches
+
+
+def seed(session, timestamps, password_hash, workers=None, admins=None, random_seed=1):
+    """Insert the synthetic data and return the names of a few of the users created, for logging in."""
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    today = now.date()
+    workers = workers or max(5, timestamps // PUNCHES_PER_WORKER)
+    admins = admins or -(-workers // WORKERS_PER_ADMIN)
+
+    users = [{'first_name': 'Master', 'last_name': 'Seed', 'password': password_hash, 'role': 'master', 'admin_code': 'seed-master'}]
+    users += [{'first_name': 'Admin', 'last_name': f'Seed{i}', 'password': password_hash, 'role': 'admin', 'admin_code': f'seed{i}'} for i in range(admins)]
+    users += [
+        {'first_name': FIRST_NAMES[i % len(FIRST_NAMES)], 'last_name': f'{LAST_NAMES[i % len(LAST_NAMES)]}{i}', 'password': password_hash, 'role': 'worker', 'admin_code': f'seed{i % admins}'}
+        for i in range(workers)
+    ]
+    bulk_insert(session, User.__table__, users)
+    created = session.execute(
+        select(User.id, User.first_name, User.last_name, User.role, User.admin_code).where(User.admin_code.in_([f'seed{i}' for i in range(admins)])).order_by(User.id)
+    ).all()
+    admin_ids = {row.admin_code: row.id for row in created if row.role == 'admin'}
+    worker_rows = [row for row in created if row.role == 'worker']
+
+    fences = {}
+    for index, (code, admin_id) in enumerate(admin_ids.items()):
+        site = SITES[index % len(SITES)]
+        fences[code] = [(*near(rng, site, 300), rng.uniform(100, 300)) for _ in range(rng.randint(1, 3))]
+    bulk_insert(session, Geofence.__table__, [
+        {'admin_id': admin_ids[code], 'latitude': lat, 'longitude': lon, 'radius': radius}
+        for code, admin_fences in fences.items() for lat, lon, radius in admin_fences
+    ])
+
+    pending_punches, pending_summaries, pending_vacations = [], [], []
+
+    def flush():
+        bulk_insert(session, Vacation.__table__, pending_vacations)
+        bulk_insert(session, Timestamp.__table__, pending_punches)
+        bulk_insert(session, WorkSummary.__table__, pending_summaries)
+        session.commit()
+        del pending_punches[:], pending_summaries[:], pending_vacations[:]
+
+    for index, worker in enumerate(worker_rows):
+        count = timestamps // workers + (index < timestamps % workers)
+        # Working days are ~5/7 of the calendar less vacations and sick days
+        span_days = count * 7 // 5 * 11 // 10 + 30
+        vacations = worker_vacations(rng, worker.id, today, span_days)
+        days_off = {
+            vacation['start_date'] + timedelta(days=offset)
+            for vacation in vacations if vacation['status'] == 'approved'
+            for offset in range((vacation['end_date'] - vacation['start_date']).days + 1)
+        }
+        punches = worker_punches(rng, worker.id, count, rng.choice(fences[worker.admin_code]), today, days_off, now)
+        summaries = defaultdict(int)
+        for punch in punches:
+            if punch['worked_seconds']:
+                for period, period_start in work_summary_periods(punch['clock_in']):
+                    summaries[period, period_start] += punch['worked_seconds']
+        pending_vacations.extend(vacations)
+        pending_punches.extend(punches)
+        pending_summaries.extend({'user_id': worker.id, 'period': period, 'period_start': period_start, 'worked_seconds': seconds} for (period, period_start), seconds in summaries.items())
+        if len(pending_punches) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    return {
+        'master': ('Master', 'Seed'),
+        'admin': ('Admin', 'Seed0'),
+        'worker': (worker_rows[0].first_name, worker_rows[0].last_name),
+        'worker_id': worker_rows[0].id,
+        'admins': admins,
+        'workers': workers,
+        'timestamps': timestamps,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timestamps', type=int, default=100000, help='punches in total, spread evenly over the workers')
+    parser.add_argument('--workers', type=int, default=None, help=f'defaults to one per {PUNCHES_PER_WORKER} punches (at least 5)')
+    parser.add_argument('--admins', type=int, default=None, help=f'defaults to one per {WORKERS_PER_ADMIN} workers')
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--seed', type=int, default=1, help='random seed; the same seed gives the same data')
+    parser.add_argument('--database-url', default=None, help='defaults to DATABASE_URL')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate every table first')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    app = create_app()
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+            db.create_all()
+        started = time.perf_counter()
+        summary = seed(db.session, args.timestamps, password_manager.hash(args.password), workers=args.workers, admins=args.admins, random_seed=args.seed)
+        print(f'Seeded {summary["admins"]} admins, {summary["workers"]} workers and {summary["timestamps"]} punches '
+              f'into {db.engine.url.render_as_string()} in {time.perf_counter() - started:.1f}s')
+        print(f'Log in as {" ".join(summary["admin"])} (admin) or {" ".join(summary["worker"])} (worker) with password {args.password!r}')
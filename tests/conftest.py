@@ -0,0 +1,17 @@
+import pytest
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path}/test.db')
+    monkeypatch.setenv('BCRYPT_LOG_ROUNDS', '4')
+    # No caching, so every request reads (and every count covers) what a cold request would
+    for variable in ('CACHE_TTL', 'IDENTITY_CACHE_TTL', 'LOGIN_CACHE_TTL'):
+        monkeypatch.setenv(variable, '0')
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+    return app
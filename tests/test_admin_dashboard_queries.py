@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from models import db, User, Timestamp
+
+# Logged-in user, workers, vacations, geofences, week/month totals and the timestamp page.
+# Anything above this means a per-row lazy load (e.g. timestamp.user) has crept back in.
+MAX_STATEMENTS = 6
+
+
+def seed(app, workers, punches_per_worker):
+    with app.app_context():
+        db.session.add(User(first_name='Ad', last_name='Min', password='pw', role='admin', admin_code='C1'))
+        db.session.execute(User.__table__.insert(), [
+            {'first_name': f'Worker{i}', 'last_name': 'Test', 'password': 'pw', 'role': 'worker', 'admin_code': 'C1'}
+            for i in range(workers)
+        ])
+        worker_ids = [user.id for user in User.query.filter_by(role='worker')]
+        start = datetime(2026, 1, 5, 8)
+        db.session.execute(Timestamp.__table__.insert(), [
+            {'user_id': user_id, 'clock_in': start + timedelta(days=day), 'clock_out': start + timedelta(days=day, hours=8), 'worked_seconds': 8 * 3600}
+            for user_id in worker_ids for day in range(punches_per_worker)
+        ])
+        db.session.commit()
+        return db.engine
+
+
+@pytest.mark.parametrize('workers, punches_per_worker', [(3, 5), (60, 20)])
+def test_admin_dashboard_issues_a_fixed_number_of_statements(app, workers, punches_per_worker):
+    engine = seed(app, workers, punches_per_worker)
+    client = app.test_client()
+    assert client.post('/login', data={'first_name': 'Ad', 'last_name': 'Min', 'password': 'pw'}).status_code == 302
+
+    statements = []
+    listener = lambda connection, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/admin_dashboard')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    assert len(statements) <= MAX_STATEMENTS, '\n\n'.join(statements)
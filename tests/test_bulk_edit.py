@@ -0,0 +1,34 @@
+from datetime import datetime
+import pytest
+from models import db, User, Timestamp, WorkSummary
+
+
+@pytest.fixture
+def punches(app):
+    with app.app_context():
+        db.session.add(User(first_name='Ad', last_name='Min', password='pw', role='admin', admin_code='C1'))
+        worker = User(first_name='Wo', last_name='Rker', password='pw', role='worker', admin_code='C1')
+        db.session.add(worker)
+        db.session.flush()
+        timestamps = [
+            Timestamp(user_id=worker.id, clock_in=datetime(2026, 1, day, 8), clock_out=datetime(2026, 1, day, 16), worked_seconds=8 * 3600)
+            for day in (5, 6)
+        ]
+        db.session.add_all(timestamps)
+        db.session.commit()
+        return [timestamp.id for timestamp in timestamps]
+
+
+@pytest.mark.parametrize('field', ['break_duration', 'lunch_duration'])
+def test_negative_minutes_reject_the_whole_batch(app, punches, field):
+    client = app.test_client()
+    assert client.post('/login', data={'first_name': 'Ad', 'last_name': 'Min', 'password': 'pw'}).status_code == 302
+    response = client.post('/bulk_edit_timestamps', json=[
+        {'timestamp_id': punches[0], 'break_duration': 30},
+        {'timestamp_id': punches[1], field: -600},
+    ])
+    assert response.status_code == 400
+    assert response.json['errors'] == [{'row': 2, 'error': 'Rast och lunch kan inte vara negativa.'}]
+    with app.app_context():
+        assert [timestamp.worked_seconds for timestamp in Timestamp.query.order_by(Timestamp.id)] == [8 * 3600, 8 * 3600]
+        assert WorkSummary.query.count() == 0
@@ -0,0 +1,50 @@
+import sys
+import types
+import pytest
+from flask import Flask
+from passwords import PasswordManager
+
+
+@pytest.fixture
+def patched_gevent(monkeypatch):
+    """Just enough of gevent for PasswordManager to take its gevent path, recording the pools it makes."""
+    pools = []
+
+    class ThreadPool:
+        def __init__(self, maxsize):
+            self.maxsize = maxsize
+            self.calls = 0
+            pools.append(self)
+
+        def apply(self, function, args):
+            self.calls += 1
+            return function(*args)
+
+        def kill(self):
+            pass
+
+    gevent = types.ModuleType('gevent')
+    gevent.monkey = types.SimpleNamespace(is_module_patched=lambda name: name == 'threading')
+    gevent.threadpool = types.SimpleNamespace(ThreadPool=ThreadPool)
+    for name, module in (('gevent', gevent), ('gevent.monkey', gevent.monkey), ('gevent.threadpool', gevent.threadpool)):
+        monkeypatch.setitem(sys.modules, name, module)
+    return pools
+
+
+def test_gevent_pool_is_bounded_by_bcrypt_max_threads(patched_gevent):
+    app = Flask(__name__)
+    app.config.update(BCRYPT_LOG_ROUNDS=4, BCRYPT_MAX_THREADS=3)
+    passwords = PasswordManager(app)
+
+    [pool] = patched_gevent
+    assert pool.maxsize == 3
+    assert passwords.verify(passwords.hash('hemligt'), 'hemligt')
+    assert pool.calls == 2
+
+
+def test_threads_bound_the_executor_without_gevent():
+    app = Flask(__name__)
+    app.config.update(BCRYPT_LOG_ROUNDS=4, BCRYPT_MAX_THREADS=2)
+    passwords = PasswordManager(app)
+    assert passwords._executor._max_workers == 2
+    assert passwords.verify(passwords.hash('hemligt'), 'hemligt')
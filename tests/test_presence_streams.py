@@ -0,0 +1,45 @@
+import pytest
+from app import presence
+from models import db, User
+
+
+@pytest.fixture
+def admin_client(app):
+    with app.app_context():
+        db.session.add(User(first_name='Ad', last_name='Min', password='pw', role='admin', admin_code='C1'))
+        db.session.commit()
+
+    def logged_in():
+        client = app.test_client()
+        assert client.post('/login', data={'first_name': 'Ad', 'last_name': 'Min', 'password': 'pw'}).status_code == 302
+        return client
+    return logged_in
+
+
+def test_streams_beyond_the_cap_are_refused_until_one_closes(app, admin_client):
+    app.config.update(PRESENCE_MAX_STREAMS=2, PRESENCE_POLL_SECONDS=15)
+    presence.init_app(app)
+    # Unbuffered responses stay open, holding their slot, until closed. They all share this thread's
+    # context stack, so they are closed newest first.
+    first, second = (admin_client().get('/presence/stream', buffered=False) for _ in range(2))
+    assert (first.status_code, second.status_code) == (200, 200)
+
+    refused = admin_client().get('/presence/stream')
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '15'
+
+    second.close()
+    reopened = admin_client().get('/presence/stream', buffered=False)
+    assert reopened.status_code == 200
+    reopened.close()
+    first.close()
+
+
+def test_refused_boards_poll_the_snapshot(app, admin_client):
+    app.config['PRESENCE_MAX_STREAMS'] = 0
+    presence.init_app(app)
+    client = admin_client()
+    assert client.get('/presence/stream').status_code == 503
+    response = client.get('/presence/snapshot')
+    assert response.status_code == 200
+    assert response.json == []
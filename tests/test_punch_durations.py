@@ -0,0 +1,70 @@
+from datetime import datetime
+import pytest
+from models import db, User, Timestamp, WorkSummary, Geofence
+
+SITE = {'latitude': 59.3293, 'longitude': 18.0686}
+
+
+@pytest.fixture
+def worker(app):
+    with app.app_context():
+        admin = User(first_name='Ad', last_name='Min', password='pw', role='admin', admin_code='C1')
+        worker = User(first_name='Wo', last_name='Rker', password='pw', role='worker', admin_code='C1')
+        db.session.add_all([admin, worker])
+        db.session.flush()
+        db.session.add(Geofence(admin_id=admin.id, radius=200, **SITE))
+        db.session.commit()
+        return worker.id
+
+
+def logged_in(app, first_name, last_name):
+    client = app.test_client()
+    assert client.post('/login', data={'first_name': first_name, 'last_name': last_name, 'password': 'pw'}).status_code == 302
+    return client
+
+
+def open_punch(client):
+    response = client.post('/api/v1/punch', json={'action': 'clock_in', **SITE})
+    assert response.status_code == 201
+    return response.json['status']['timestamp_id']
+
+
+def assert_nothing_recorded(app, timestamp_id):
+    with app.app_context():
+        timestamp = db.session.get(Timestamp, timestamp_id)
+        assert timestamp.clock_out is None and timestamp.worked_seconds is None
+        assert WorkSummary.query.count() == 0
+
+
+@pytest.mark.parametrize('field', ['break_duration', 'lunch_duration'])
+def test_api_clock_out_rejects_negative_minutes(app, worker, field):
+    client = logged_in(app, 'Wo', 'Rker')
+    timestamp_id = open_punch(client)
+    response = client.post('/api/v1/punch', json={'action': 'clock_out', 'timestamp_id': timestamp_id, field: -6000, **SITE})
+    assert response.status_code == 400
+    assert response.json['result'] == 'negative_duration'
+    assert_nothing_recorded(app, timestamp_id)
+
+
+def test_dashboard_clock_out_rejects_negative_break(app, worker):
+    client = logged_in(app, 'Wo', 'Rker')
+    timestamp_id = open_punch(client)
+    response = client.post('/worker_dashboard', data={'action': 'clock_out', 'timestamp_id': timestamp_id, 'break_duration': '-6000', **SITE})
+    assert response.status_code == 302
+    assert_nothing_recorded(app, timestamp_id)
+
+
+def test_edit_timestamp_rejects_negative_break(app, worker):
+    with app.app_context():
+        timestamp = Timestamp(user_id=worker, clock_in=datetime(2026, 1, 5, 8), clock_out=datetime(2026, 1, 5, 16), worked_seconds=8 * 3600)
+        db.session.add(timestamp)
+        db.session.commit()
+        timestamp_id = timestamp.id
+    client = logged_in(app, 'Ad', 'Min')
+    response = client.post(f'/edit_timestamp/{timestamp_id}', data={
+        'clock_in': '2026-01-05T08:00', 'clock_out': '2026-01-05T16:00', 'break_duration': '-6000', 'lunch_duration': '0',
+    })
+    assert response.status_code == 200
+    assert 'Rast och lunch kan inte vara negativa.' in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(Timestamp, timestamp_id).worked_seconds == 8 * 3600
@@ -0,0 +1,45 @@
+from datetime import date, datetime
+from sqlalchemy import event
+from app import add_to_work_summary
+from models import db, User, WorkSummary
+
+
+def totals():
+    return {(row.period, row.period_start): row.worked_seconds for row in WorkSummary.query}
+
+
+def test_first_and_later_punches_add_up_in_one_row_per_period(app):
+    with app.app_context():
+        worker = User(first_name='Wo', last_name='Rker', password='pw', role='worker', admin_code='C1')
+        db.session.add(worker)
+        db.session.commit()
+
+        add_to_work_summary(worker.id, datetime(2026, 1, 7, 8), 3600)
+        add_to_work_summary(worker.id, datetime(2026, 1, 7, 13), 1800)
+        add_to_work_summary(worker.id, datetime(2026, 1, 8, 8), 600)
+        db.session.commit()
+        assert totals() == {('day', date(2026, 1, 7)): 5400, ('day', date(2026, 1, 8)): 600, ('week', date(2026, 1, 5)): 6000}
+
+
+def test_rollups_are_upserted_in_one_statement(app):
+    # UPDATE-then-INSERT let two first punches of a period both insert and one fail on the unique constraint
+    with app.app_context():
+        worker = User(first_name='Wo', last_name='Rker', password='pw', role='worker', admin_code='C1')
+        db.session.add(worker)
+        db.session.flush()
+        worker_id = worker.id
+        db.session.add(WorkSummary(user_id=worker_id, period='day', period_start=date(2026, 1, 7), worked_seconds=3600))
+        db.session.commit()
+
+        statements = []
+        listener = lambda connection, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            add_to_work_summary(worker_id, datetime(2026, 1, 7, 13), 1800)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        db.session.commit()
+
+        [statement] = statements
+        assert statement.startswith('INSERT INTO work_summary') and 'ON CONFLICT' in statement
+        assert totals() == {('day', date(2026, 1, 7)): 5400, ('week', date(2026, 1, 5)): 1800}
@@ -0,0 +1,42 @@
+from collections import namedtuple
+from datetime import timedelta
+
+# Declined requests never block a new request and are left off the calendar
+ACTIVE_STATUSES = ('pending', 'approved')
+
+DayOff = namedtuple('DayOff', ['day', 'vacations'])
+
+
+def find_overlap(vacation_model, user_id, start, end):
+    """The user's first pending or approved vacation sharing a day with [start, end], or None."""
+    return vacation_model.query.filter(
+        vacation_model.user_id == user_id,
+        vacation_model.end_date >= start,
+        vacation_model.start_date <= end,
+        vacation_model.status.in_(ACTIVE_STATUSES),
+    ).order_by(vacation_model.start_date).first()
+
+
+def vacations_between(vacation_model, user_ids, start, end=None, statuses=None):
+    """Vacations of `user_ids` overlapping [start, end] (open-ended without `end`), earliest first.
+
+    Both bounds are inclusive. The end_date >= start condition is the range scan on
+    ix_vacation_user_id_end_date_start_date, so past vacations are never read.
+    """
+    query = vacation_model.query.filter(vacation_model.user_id.in_(user_ids), vacation_model.end_date >= start)
+    if end is not None:
+        query = query.filter(vacation_model.start_date <= end)
+    if statuses is not None:
+        query = query.filter(vacation_model.status.in_(statuses))
+    return query.order_by(vacation_model.start_date, vacation_model.id).all()
+
+
+def days_off(vacations, start, end):
+    """One DayOff per date in [start, end] with the vacations covering that date."""
+    covering = {start + timedelta(days=offset): [] for offset in range((end - start).days + 1)}
+    for vacation in vacations:
+        day = max(vacation.start_date, start)
+        while day <= min(vacation.end_date, end):
+            covering[day].append(vacation)
+            day += timedelta(days=1)
+    return [DayOff(day, day_vacations) for day, day_vacations in covering.items()]